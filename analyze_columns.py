@@ -1,13 +1,21 @@
+import io
 import os
-import random
 import csv
 import re
-from bs4 import BeautifulSoup
+import json
+import hashlib
+import argparse
+from html.parser import HTMLParser
+from concurrent.futures import ProcessPoolExecutor
+
+from archive import atomic_write
 
 folder = 'car_specs'
-columns = set()
-car_data = {}
-car_columns = {}
+output_file = 'car_data.csv'
+manifest_file = 'car_specs_manifest.json'
+
+# Bump when parsing changes so cached results in the manifest are redone
+PARSER_VERSION = 1
 
 # Multi-word makes (lowercased for case-insensitive comparison)
 multi_word_makes = {
@@ -27,159 +35,307 @@ multi_word_makes = {
     'tata motors'
 }
 
-for filename in os.listdir(folder):
-    if filename.endswith('.txt'):
-        filepath = os.path.join(folder, filename)
-        # Extract car name by removing the suffix
-        car_name_full = filename.replace("Photos, engines & full specs.txt", "").strip()
-        car_name = car_name_full
-        year = None
-        # Check for (XXXX-...) at the end and remove it
-        if car_name_full.endswith(')'):
-            start = car_name_full.rfind('(')
-            if start != -1:
-                inside = car_name_full[start+1:-1]
-                parts = inside.split('-')
-                if parts and len(parts[0]) == 4 and parts[0].isdigit():
-                    year = parts[0]
-                # Always remove the parentheses
-                car_name = car_name_full[:start].strip()
-        # If no year found, check if starts with 4-digit year
-        if year is None and len(car_name_full) >= 4 and car_name_full[:4].isdigit():
-            year = car_name_full[:4]
-            car_name = car_name_full[5:].strip()
-        
-        # Remove any remaining parentheses from car_name
-        car_name = car_name.replace('(', '').replace(')', '')
-        
-        # Separate make and model
-        car_name_lower = car_name.lower()
-        make = None
-        model = None
-        # Special case for MGU9
-        if car_name_lower == 'mgu9':
-            make = 'MG'
-            model = 'U9'
-        else:
-            for mwm in multi_word_makes:
-                if car_name_lower.startswith(mwm):
-                    make = car_name[:len(mwm)].strip().title()
-                    model = car_name[len(mwm):].strip()
-                    break
-            if not make:
-                parts = car_name.split(' ', 1)
-                make = parts[0].title()
-                model = parts[1] if len(parts) > 1 else ''
-        
-        # Make specific makes all-caps
-        if make.lower() in ['baic', 'bmw', 'ds', 'gmc', 'ram', 'seat']:
-            make = make.upper()
-        elif make.lower() == 'mclaren':
-            make = 'McLaren'
-        
-        make = make.replace("Mercedes Benz", "Mercedes-Benz")
-        make = make.replace("Rolls Royce", "Rolls-Royce")
-        car_name = car_name.replace("Mercedes Benz", "Mercedes-Benz")
-
-        # Normalize model: title-case any word that is not all-caps (keep acronyms like 'GT' as-is)
-        if model:
-            parts = model.split()
-            norm_parts = []
-            for p in parts:
-                if p.isupper():
-                    norm_parts.append(p)
-                else:
-                    norm_parts.append(p.title())
-            model = ' '.join(norm_parts)
-
-        car_data[car_name] = {'year': year, 'make': make, 'model': model, 'cylinders': '', 'power': '', 'torque': '', 'fuel_capacity': '', 'horsepower': ''}
-        car_columns[car_name] = set()
-        
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                content = f.read()
-            soup = BeautifulSoup(content, 'html.parser')
-            table = soup.find('table', class_='techdata')
-            if table:
-                rows = table.find_all('tr')
-                for row in rows:
-                    tds = row.find_all('td')
-                    if len(tds) >= 2:
-                        left_text = tds[0].get_text(strip=True).rstrip(':')
-                        right_text = tds[1].get_text(strip=True)
-                        car_columns[car_name].add(left_text)
-                        columns.add(left_text)
-                        if left_text == 'Cylinders':
-                            car_data[car_name]['cylinders'] = right_text
-                        elif left_text == 'Power':
-                            car_data[car_name]['power'] = right_text
-                        elif left_text == 'Torque':
-                            car_data[car_name]['torque'] = right_text
-                        elif left_text == 'Fuel capacity':
-                            car_data[car_name]['fuel_capacity'] = right_text
-                # Extract horsepower from the power string using regex (numbers before 'HP' or 'BHP')
-                power_str = car_data[car_name].get('power', '')
-                hp_found = None
-                if power_str:
-                    # try to find a number followed by HP (e.g., '272 HP')
-                    m = re.search(r"(\d+(?:\.\d+)?)\s*(?:HP|BHP)\b", power_str, flags=re.IGNORECASE)
-                    if m:
-                        # use integer part if possible
-                        hp_found = m.group(1).split('.')[0]
-                    else:
-                        # fallback: look for tokens like 'RPM375' (digits after RPM)
-                        for token in power_str.split():
-                            t = token.strip()
-                            if t.upper().startswith('RPM'):
-                                digits = ''.join(ch for ch in t[3:] if ch.isdigit())
-                                if digits:
-                                    hp_found = digits
-                                    break
-                if hp_found:
-                    car_data[car_name]['horsepower'] = hp_found
-        except Exception as e:
-            print(f"Error processing {filename}: {e}")
-
 # Filter cars: must have year and required columns
 required_columns = {'Cylinders', 'Power', 'Torque', 'Fuel capacity'}
-filtered_car_data = {name: data for name, data in car_data.items()
-                     if data['year'] and data.get('make') and data.get('model') and required_columns.issubset(car_columns.get(name, set()))}
 
+fieldnames = ['Year', 'Make', 'Model', 'Car Name', 'Cylinders', 'Power', 'Torque', 'Fuel capacity', 'Horsepower']
 
-for k, v in filtered_car_data.items():
-    if "power" not in v: 
-        print(k, v)
-        input()
-        continue
-    # tokens = v["power"].split(" ")
-    # for t in tokens:
-    #     if t.startswith("RPM"):
-    #         v["power"] = t[3:]
-    #         break
 
-    v["torque"] = v["torque"].split(" ")[0]
-    v["fuel_capacity"] = v["fuel_capacity"].split(" ")[0]
+def parse_car_name(filename):
+    """Split a spec page filename into (car name, year, make, model)"""
+    # Extract car name by removing the suffix
+    car_name_full = filename.replace("Photos, engines & full specs.txt", "").strip()
+    car_name = car_name_full
+    year = None
+    # Check for (XXXX-...) at the end and remove it
+    if car_name_full.endswith(')'):
+        start = car_name_full.rfind('(')
+        if start != -1:
+            inside = car_name_full[start+1:-1]
+            parts = inside.split('-')
+            if parts and len(parts[0]) == 4 and parts[0].isdigit():
+                year = parts[0]
+            # Always remove the parentheses
+            car_name = car_name_full[:start].strip()
+    # If no year found, check if starts with 4-digit year
+    if year is None and len(car_name_full) >= 4 and car_name_full[:4].isdigit():
+        year = car_name_full[:4]
+        car_name = car_name_full[5:].strip()
 
+    # Remove any remaining parentheses from car_name
+    car_name = car_name.replace('(', '').replace(')', '')
 
+    # Separate make and model
+    car_name_lower = car_name.lower()
+    make = None
+    model = None
+    # Special case for MGU9
+    if car_name_lower == 'mgu9':
+        make = 'MG'
+        model = 'U9'
+    else:
+        for mwm in multi_word_makes:
+            if car_name_lower.startswith(mwm):
+                make = car_name[:len(mwm)].strip().title()
+                model = car_name[len(mwm):].strip()
+                break
+        if not make:
+            parts = car_name.split(' ', 1)
+            make = parts[0].title()
+            model = parts[1] if len(parts) > 1 else ''
 
-# Export to CSV (include spec columns)
-with open('car_data.csv', 'w', newline='', encoding='utf-8') as csvfile:
-    fieldnames = ['Year', 'Make', 'Model', 'Car Name', 'Cylinders', 'Power', 'Torque', 'Fuel capacity', 'Horsepower']
-    
-    writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-    writer.writeheader()
+    # Make specific makes all-caps
+    if make.lower() in ['baic', 'bmw', 'ds', 'gmc', 'ram', 'seat']:
+        make = make.upper()
+    elif make.lower() == 'mclaren':
+        make = 'McLaren'
+
+    make = make.replace("Mercedes Benz", "Mercedes-Benz")
+    make = make.replace("Rolls Royce", "Rolls-Royce")
+    car_name = car_name.replace("Mercedes Benz", "Mercedes-Benz")
+
+    # Normalize model: title-case any word that is not all-caps (keep acronyms like 'GT' as-is)
+    if model:
+        parts = model.split()
+        norm_parts = []
+        for p in parts:
+            if p.isupper():
+                norm_parts.append(p)
+            else:
+                norm_parts.append(p.title())
+        model = ' '.join(norm_parts)
+
+    return car_name, year, make, model
+
+
+TABLE_TAG = re.compile(r'<(/?)table\b[^>]*>', re.IGNORECASE)
+CLASS_ATTR = re.compile(r'''\bclass\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))''', re.IGNORECASE)
+
+
+def find_techdata_table(content):
+    """Slice out the first <table class="techdata"> ... </table>, or None.
+
+    Only this slice is parsed, instead of building a DOM for the whole page.
+    """
+    start = None
+    depth = 0
+    for m in TABLE_TAG.finditer(content):
+        if start is None:
+            if m.group(1):
+                continue
+            cls = CLASS_ATTR.search(m.group(0))
+            classes = next((g for g in cls.groups() if g is not None), '') if cls else ''
+            if 'techdata' in classes.split():
+                start = m.start()
+                depth = 1
+        elif m.group(1):
+            depth -= 1
+            if depth == 0:
+                return content[start:m.end()]
+        else:
+            depth += 1
+    return content[start:] if start is not None else None
+
+
+class TechdataRows(HTMLParser):
+    """Collects the text of each <td> per <tr>, like get_text(strip=True)"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows = []
+        self._cells = None
+        self._open_cells = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'tr':
+            self._cells = []
+            self.rows.append(self._cells)
+        elif tag == 'td' and self._cells is not None:
+            cell = []
+            self._cells.append(cell)
+            self._open_cells.append(cell)
+
+    def handle_endtag(self, tag):
+        if tag == 'td' and self._open_cells:
+            self._open_cells.pop()
+
+    def handle_data(self, data):
+        text = data.strip()
+        if text:
+            for cell in self._open_cells:
+                cell.append(text)
+
+
+def extract_techdata(content):
+    """(label, value) pairs from the techdata table of a spec page"""
+    table = find_techdata_table(content)
+    if table is None:
+        return None
+    parser = TechdataRows()
+    parser.feed(table)
+    parser.close()
+    pairs = []
+    for cells in parser.rows:
+        if len(cells) >= 2:
+            pairs.append((''.join(cells[0]).rstrip(':'), ''.join(cells[1])))
+    return pairs
+
+
+def extract_horsepower(power_str):
+    """Horsepower from the power string (numbers before 'HP' or 'BHP')"""
+    if not power_str:
+        return None
+    # try to find a number followed by HP (e.g., '272 HP')
+    m = re.search(r"(\d+(?:\.\d+)?)\s*(?:HP|BHP)\b", power_str, flags=re.IGNORECASE)
+    if m:
+        # use integer part if possible
+        return m.group(1).split('.')[0]
+    # fallback: look for tokens like 'RPM375' (digits after RPM)
+    for token in power_str.split():
+        t = token.strip()
+        if t.upper().startswith('RPM'):
+            digits = ''.join(ch for ch in t[3:] if ch.isdigit())
+            if digits:
+                return digits
+    return None
+
+
+def parse_spec_file(filepath):
+    """Parse one spec page into a record; runs in a worker process"""
+    filename = os.path.basename(filepath)
+    car_name, year, make, model = parse_car_name(filename)
+    record = {'name': car_name, 'year': year, 'make': make, 'model': model, 'columns': [],
+              'cylinders': '', 'power': '', 'torque': '', 'fuel_capacity': '', 'horsepower': ''}
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            content = f.read()
+        pairs = extract_techdata(content)
+        if pairs is not None:
+            columns = set()
+            for left_text, right_text in pairs:
+                columns.add(left_text)
+                if left_text == 'Cylinders':
+                    record['cylinders'] = right_text
+                elif left_text == 'Power':
+                    record['power'] = right_text
+                elif left_text == 'Torque':
+                    record['torque'] = right_text
+                elif left_text == 'Fuel capacity':
+                    record['fuel_capacity'] = right_text
+            record['columns'] = sorted(columns)
+            hp_found = extract_horsepower(record['power'])
+            if hp_found:
+                record['horsepower'] = hp_found
+    except Exception as e:
+        print(f"Error processing {filename}: {e}")
+    return record
+
+
+def file_sha256(filepath):
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get('parser_version') != PARSER_VERSION:
+        return {}
+    return manifest.get('files', {})
+
+
+def ingest(folder, manifest_path, workers=None, force=False):
+    """Parse every spec page, reusing manifest results for unchanged files.
+
+    A file is unchanged if its size and mtime match the manifest, or, when
+    only the mtime moved, if its sha256 still matches.
+    """
+    previous = {} if force else load_manifest(manifest_path)
+    files = {}
+    to_parse = []
+    for filename in sorted(os.listdir(folder)):
+        if not filename.endswith('.txt'):
+            continue
+        filepath = os.path.join(folder, filename)
+        stat = os.stat(filepath)
+        entry = previous.get(filename)
+        if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime_ns:
+            files[filename] = entry
+            continue
+        sha = file_sha256(filepath)
+        if entry and entry['sha256'] == sha:
+            files[filename] = dict(entry, size=stat.st_size, mtime=stat.st_mtime_ns)
+            continue
+        files[filename] = {'size': stat.st_size, 'mtime': stat.st_mtime_ns, 'sha256': sha, 'record': None}
+        to_parse.append(filename)
+
+    print(f"{len(files)} spec pages, {len(to_parse)} new or changed")
+    if to_parse:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            paths = [os.path.join(folder, filename) for filename in to_parse]
+            for filename, record in zip(to_parse, pool.map(parse_spec_file, paths, chunksize=16)):
+                files[filename]['record'] = record
+
+    manifest = {'parser_version': PARSER_VERSION, 'files': files}
+    atomic_write(manifest_path, json.dumps(manifest, indent=1, sort_keys=True).encode('utf-8'))
+    return [files[filename]['record'] for filename in sorted(files)]
+
+
+def build_rows(records):
+    """Filter parsed records and shape them into CSV rows"""
+    car_data = {}
+    car_columns = {}
+    for record in records:
+        car_data[record['name']] = record
+        car_columns[record['name']] = set(record['columns'])
+
+    filtered_car_data = {name: data for name, data in car_data.items()
+                         if data['year'] and data.get('make') and data.get('model') and required_columns.issubset(car_columns.get(name, set()))}
+
+    rows = []
     for name in sorted(filtered_car_data.keys()):
         data = filtered_car_data[name]
-        writer.writerow({
+        if not data.get('power'):
+            print(f"Warning: {name} has no power value")
+        rows.append({
             'Year': data['year'],
             'Make': data['make'],
             'Model': data['model'],
             'Car Name': name,
             'Cylinders': data.get('cylinders', ''),
             'Power': data.get('power', ''),
-            'Torque': data.get('torque', ''),
-            'Fuel capacity': data.get('fuel_capacity', ''),
+            'Torque': data['torque'].split(" ")[0],
+            'Fuel capacity': data['fuel_capacity'].split(" ")[0],
             'Horsepower': data.get('horsepower', '')
         })
+    return rows
+
+
+def write_csv(path, rows):
+    """Export to CSV atomically, so a failed run never leaves a partial file"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames)
+    writer.writeheader()
+    writer.writerows(rows)
+    atomic_write(path, buffer.getvalue().encode('utf-8'))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build car_data.csv from the spec pages in car_specs/")
+    parser.add_argument('--folder', default=folder)
+    parser.add_argument('--output', default=output_file)
+    parser.add_argument('--manifest', default=manifest_file)
+    parser.add_argument('--workers', type=int, default=None, help="Parser processes (default: CPU count)")
+    parser.add_argument('--force', action='store_true', help="Re-parse every page, ignoring the manifest")
+    args = parser.parse_args()
 
-print("\nData exported to car_data.csv")
\ No newline at end of file
+    records = ingest(args.folder, args.manifest, workers=args.workers, force=args.force)
+    rows = build_rows(records)
+    write_csv(args.output, rows)
+    print(f"\nData exported to {args.output} ({len(rows)} cars)")
@@ -0,0 +1,159 @@
+"""Logging setup: leveled, queue-backed, with per-request correlation IDs.
+
+Records are put on an in-memory queue and written to stderr by a listener
+thread, so a request never waits on a terminal or pipe. If the queue fills
+up, records are dropped (and counted) rather than blocking.
+
+Configured from the environment:
+
+    LOG_MODE    "production" logs warnings and errors only and turns off
+                the access log, so steady-state requests emit nothing
+    LOG_LEVEL   overrides the level (DEBUG, INFO, WARNING, ...)
+    LOG_FORMAT  "text" (default) or "json", one object per line
+"""
+import contextvars
+import itertools
+import json
+import logging
+import os
+import queue
+import secrets
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+# Correlation ID of the request being handled, "-" outside requests
+request_id = contextvars.ContextVar("request_id", default="-")
+
+LOG_MODE = os.environ.get("LOG_MODE", "development")
+PRODUCTION = LOG_MODE == "production"
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "WARNING" if PRODUCTION else "INFO").upper()
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text")
+QUEUE_SIZE = 10000
+
+_handler = None
+_listener = None
+_listener_pid = None
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = request_id.get()
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record, including any ``extra`` fields"""
+
+    _standard = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in self._standard:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def configure_logging():
+    """Route all logging through the queue; safe to call again (e.g. in a forked worker)"""
+    global _handler, _listener, _listener_pid
+    root = logging.getLogger()
+    if _handler is not None:
+        root.removeHandler(_handler)
+    # After a fork the listener thread doesn't exist in this process
+    if _listener is not None and _listener_pid == os.getpid():
+        _listener.stop()
+
+    output = logging.StreamHandler(sys.stderr)
+    if LOG_FORMAT == "json":
+        output.setFormatter(JSONFormatter())
+    else:
+        formatter = logging.Formatter("%(asctime)s.%(msecs)03d %(levelname)s %(name)s [%(request_id)s] %(message)s",
+                                      "%Y-%m-%d %H:%M:%S")
+        formatter.converter = time.gmtime
+        output.setFormatter(formatter)
+
+    log_queue = queue.Queue(QUEUE_SIZE)
+    _handler = DroppingQueueHandler(log_queue)
+    # The filter runs in the caller's thread, where the request's context is
+    _handler.addFilter(RequestIdFilter())
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    _listener_pid = os.getpid()
+    root.addHandler(_handler)
+    root.setLevel(LOG_LEVEL)
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None and _listener_pid == os.getpid():
+        _listener.stop()
+    _listener = None
+
+
+_request_prefix = secrets.token_hex(3)
+_request_counter = itertools.count(1)
+
+
+def new_request_id():
+    """Short ID, unique across worker processes"""
+    return f"{_request_prefix}-{next(_request_counter):x}"
+
+
+class RequestIdMiddleware:
+    """ASGI middleware: gives each request a correlation ID.
+
+    An incoming ``X-Request-ID`` header is reused, otherwise one is made up.
+    The ID is available to every log record emitted while handling the
+    request and is echoed back in the response headers.
+    """
+
+    header = b"x-request-id"
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        rid = None
+        for name, value in scope["headers"]:
+            if name == self.header:
+                rid = value.decode("latin-1")[:64]
+                break
+        rid = rid or new_request_id()
+        token = request_id.set(rid)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), (self.header, rid.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id.reset(token)
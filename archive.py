@@ -0,0 +1,301 @@
+import hashlib
+import json
+import mmap
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: locks then only cover the threads of one process
+    fcntl = None
+
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+
+def atomic_write(path, data: bytes):
+    """Write a file via a temp file + rename so readers never see partial data"""
+    # abspath so a bare filename lands in the current directory
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+@contextmanager
+def file_lock(path):
+    """Exclusive lock shared by every thread and process using the same path.
+
+    POSIX record locks (lockf) coordinate processes; unlike flock they are
+    not inherited by forked children such as render pool workers, which
+    would otherwise keep a lock held after its owner released it. Record
+    locks don't exclude threads of the same process, so a per-path thread
+    lock is taken first.
+    """
+    with _thread_locks_guard:
+        thread_lock = _thread_locks.setdefault(os.path.abspath(path), threading.Lock())
+    with thread_lock:
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.lockf(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            # Closing the descriptor releases the lock
+            os.close(fd)
+
+
+def record_digests(record):
+    """Every blob digest a cache header or day manifest refers to"""
+    digests = [record["source"], *record["clues"]]
+    for rendition in record.get("renditions", ()):
+        for blobs in rendition["formats"].values():
+            digests += blobs
+    return digests
+
+
+class BlobStore:
+    """Directory of immutable blobs named by the sha256 of their contents"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def _blob_path(self, digest):
+        return os.path.join(self.root, "blobs", digest[:2], digest)
+
+    def put_blob(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            atomic_write(path, data)
+        return digest
+
+    def read_blob(self, digest) -> bytes:
+        """Read a blob, verifying it still matches its digest"""
+        with open(self._blob_path(digest), "rb") as f:
+            data = f.read()
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise ValueError(f"Checksum mismatch for blob {digest}")
+        return data
+
+    def open_blob(self, digest) -> memoryview:
+        """Memory-map a blob read-only, verifying it still matches its digest"""
+        with open(self._blob_path(digest), "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if hashlib.sha256(mapped).hexdigest() != digest:
+            mapped.close()
+            raise ValueError(f"Checksum mismatch for blob {digest}")
+        return memoryview(mapped)
+
+    def put_renditions(self, renditions):
+        """Store encoded clue renditions; returns them with digests in place of bytes"""
+        return [{"width": rendition["width"],
+                 "formats": {fmt: [self.put_blob(data) for data in blobs]
+                             for fmt, blobs in rendition["formats"].items()}}
+                for rendition in renditions]
+
+    def remove_blob(self, digest):
+        try:
+            os.remove(self._blob_path(digest))
+        except OSError:
+            pass
+
+    def blob_digests(self):
+        blobs_dir = os.path.join(self.root, "blobs")
+        if not os.path.isdir(blobs_dir):
+            return []
+        return [name for prefix in os.listdir(blobs_dir)
+                for name in os.listdir(os.path.join(blobs_dir, prefix))
+                if not name.startswith(".")]
+
+
+class CarCache(BlobStore):
+    """Cache of the current day's car.
+
+    ``header.json`` holds the day number, the car record and the digests of
+    the pre-encoded images, which live next to it as separate blobs. Checking
+    whether the cache is stale only reads the header; images are mapped when
+    they are needed and checked against their digest, so corruption shows up
+    as a checksum error instead of a half-decoded pickle.
+    """
+
+    FORMAT_VERSION = 1
+
+    def __init__(self, root):
+        super().__init__(root)
+        self.header_path = os.path.join(root, "header.json")
+
+    def lock(self):
+        """Cross-process lock held while a worker regenerates the cache"""
+        return file_lock(os.path.join(self.root, "lock"))
+
+    def header_mtime(self):
+        """Modification time of the header, or None if there is no cache"""
+        try:
+            return os.stat(self.header_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def read_header(self):
+        """Return the cache header, or None if missing, corrupt or outdated"""
+        try:
+            with open(self.header_path, "rb") as f:
+                header = json.loads(f.read())
+        except (OSError, ValueError):
+            return None
+        if not isinstance(header, dict) or header.get("format") != self.FORMAT_VERSION:
+            return None
+        return header
+
+    def write(self, day_number, car, source: bytes, clues, renditions=()):
+        """Store a day's images, then publish them by replacing the header"""
+        header = {
+            "format": self.FORMAT_VERSION,
+            "day_number": int(day_number),
+            "car": car,
+            "source": self.put_blob(source),
+            "clues": [self.put_blob(data) for data in clues],
+            "renditions": self.put_renditions(renditions),
+        }
+        atomic_write(self.header_path, json.dumps(header).encode("utf-8"))
+        # Blobs from earlier days are no longer referenced
+        live = set(record_digests(header))
+        for digest in self.blob_digests():
+            if digest not in live:
+                self.remove_blob(digest)
+        return header
+
+    def clear(self):
+        try:
+            os.remove(self.header_path)
+        except OSError:
+            pass
+        for digest in self.blob_digests():
+            self.remove_blob(digest)
+
+
+class DayArchive(BlobStore):
+    """Content-addressed on-disk archive of per-day artifacts.
+
+    Layout::
+
+        root/blobs/ab/abcdef...   raw bytes, named by their sha256
+        root/days/<day>.json      manifest: car record + blob digests of the
+                                  source, the clue PNGs and the other clue
+                                  renditions (formats and preview sizes)
+
+    A manifest's mtime is bumped on every read, and eviction drops the least
+    recently used days until the archive fits in ``max_bytes``. Blobs no
+    longer referenced by any manifest are then removed.
+
+    Several processes may share one archive: building a day is guarded by
+    ``lock(day)`` and eviction by its own lock file under ``root/locks``.
+    """
+
+    # Days are locked through a fixed set of lock files rather than one each
+    LOCK_STRIPES = 64
+
+    def __init__(self, root, max_bytes):
+        super().__init__(root)
+        self.max_bytes = max_bytes
+
+    def _day_path(self, day):
+        return os.path.join(self.root, "days", f"{int(day)}.json")
+
+    def lock(self, day):
+        """Cross-process lock for building one day"""
+        return file_lock(os.path.join(self.root, "locks", f"{int(day) % self.LOCK_STRIPES}.lock"))
+
+    def get(self, day, touch=True):
+        """Return the manifest for a day, or None if it is not archived.
+
+        Reading a day marks it recently used for eviction unless ``touch``
+        is false, for lookups that don't serve the day itself.
+        """
+        path = self._day_path(day)
+        try:
+            with open(path, "rb") as f:
+                manifest = json.loads(f.read())
+            if touch:
+                os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return manifest
+
+    def put(self, day, car, source: bytes, clues, renditions=()):
+        """Store a day's car, source image and encoded clue variants"""
+        manifest = {
+            "day_number": int(day),
+            "car": car,
+            "source": self.put_blob(source),
+            "clues": [self.put_blob(data) for data in clues],
+            "renditions": self.put_renditions(renditions),
+        }
+        atomic_write(self._day_path(day), json.dumps(manifest).encode("utf-8"))
+        self.evict()
+        return manifest
+
+    def days(self):
+        days_dir = os.path.join(self.root, "days")
+        if not os.path.isdir(days_dir):
+            return []
+        return sorted(int(name[:-5]) for name in os.listdir(days_dir) if name.endswith(".json"))
+
+    def _size(self, path):
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    def evict(self):
+        """Drop least recently used days until the archive fits its budget"""
+        with file_lock(os.path.join(self.root, "locks", "evict.lock")):
+            entries = []
+            for day in self.days():
+                path = self._day_path(day)
+                try:
+                    with open(path, "rb") as f:
+                        manifest = json.loads(f.read())
+                    last_used = os.path.getmtime(path)
+                except (OSError, ValueError):
+                    continue
+                digests = record_digests(manifest)
+                entries.append((last_used, path, digests))
+
+            sizes = {}
+            for _, path, digests in entries:
+                for digest in digests:
+                    if digest not in sizes:
+                        sizes[digest] = self._size(self._blob_path(digest))
+            total = sum(sizes.values()) + sum(self._size(path) for _, path, _ in entries)
+            if total <= self.max_bytes:
+                return
+
+            entries.sort()
+            live = list(entries)
+            while live and total > self.max_bytes:
+                _, path, digests = live.pop(0)
+                total -= self._size(path)
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                still_used = {d for _, _, ds in live for d in ds}
+                for digest in set(digests) - still_used:
+                    total -= sizes.get(digest, 0)
+                    self.remove_blob(digest)
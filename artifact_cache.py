@@ -0,0 +1,113 @@
+import threading
+from collections import OrderedDict
+
+
+class ArtifactCache:
+    """In-memory LRU of per-day artifacts, bounded by their size in bytes.
+
+    Entries are keyed by day number and carry the size they were put with.
+    Putting past ``max_bytes`` evicts the least recently used days; the
+    pinned day (the one being served) is never evicted, so the budget only
+    limits how much history a worker keeps around.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # day -> (value, size)
+        self._lock = threading.Lock()
+        self.pinned = None
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, day):
+        with self._lock:
+            entry = self._entries.get(day)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(day)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, day, value, size):
+        """Cache a day's artifacts unless they alone exceed the budget"""
+        with self._lock:
+            old = self._entries.pop(day, None)
+            if old is not None:
+                self.bytes -= old[1]
+            if size > self.max_bytes and day != self.pinned:
+                return
+            self._entries[day] = (value, size)
+            self.bytes += size
+            self._evict()
+
+    def pin(self, day):
+        """Make ``day`` the one never evicted; the previously pinned day becomes evictable"""
+        with self._lock:
+            self.pinned = day
+            self._evict()
+
+    def _evict(self):
+        for day in list(self._entries):
+            if self.bytes <= self.max_bytes:
+                break
+            if day == self.pinned:
+                continue
+            _, size = self._entries.pop(day)
+            self.bytes -= size
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class LRUCache:
+    """In-memory LRU bounded by its number of entries, for values that are
+    all roughly the same size"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Cache a value, evicting the least recently used past ``max_entries``"""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,177 @@
+"""Compare indexed guess checking against the old linear scan.
+
+Checks every catalog car against a fixed answer, first with the original
+scan + per-request parsing, then with car_index and the per-guess
+compare_cars below, then as lookups in the day's precomputed GuessTable,
+and fails if any disagree. The server only uses the GuessTable, whose
+statuses come from main.compare_column a column at a time; compare_cars
+is an independent reference for it.
+
+    python benchmarks/bench_check_guess.py [--repeat N]
+"""
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+with contextlib.redirect_stdout(io.StringIO()):
+    import main
+
+
+def safe_value(val):
+    if isinstance(val, float) and math.isnan(val):
+        return None
+    return val
+
+
+def reference_check(documents, guessed_car_name, correct_car):
+    """The original /check-guess body: linear scan, parse on every call"""
+    guessed_car = None
+    for doc in documents:
+        full_name = f"{doc['Make']} {doc['Model']}"
+        if full_name.lower() == guessed_car_name.lower():
+            guessed_car = doc
+            break
+    if not guessed_car:
+        return {"error": "Car not found"}
+
+    correct_name = f"{correct_car['Make']} {correct_car['Model']}"
+    is_correct = guessed_car_name.lower() == correct_name.lower()
+
+    def compare_value(guessed, correct, value_type):
+        if guessed is None or correct is None:
+            return {"status": "unknown", "value": guessed}
+        if value_type == "string":
+            return {
+                "status": "correct" if str(guessed).lower() == str(correct).lower() else "incorrect",
+                "value": guessed
+            }
+        try:
+            g_str = str(guessed).replace(',', '')
+            c_str = str(correct).replace(',', '')
+            if value_type == "cylinders":
+                g_match = re.search(r'\d+', g_str)
+                c_match = re.search(r'\d+', c_str)
+                g_val = float(g_match.group(0)) if g_match else float(g_str)
+                c_val = float(c_match.group(0)) if c_match else float(c_str)
+            else:
+                g_val = float(g_str)
+                c_val = float(c_str)
+            if g_val == c_val:
+                status = "correct"
+            elif g_val < c_val:
+                status = "lower"
+            else:
+                status = "higher"
+            return {"status": status, "value": guessed}
+        except (ValueError, TypeError):
+            return {"status": "unknown", "value": guessed}
+
+    return {
+        "is_correct": is_correct,
+        "make": guessed_car["Make"],
+        "make_correct": guessed_car["Make"].lower() == correct_car["Make"].lower(),
+        "comparisons": {
+            "year": compare_value(safe_value(guessed_car["Year"]), safe_value(correct_car["Year"]), "number"),
+            "cylinders": compare_value(safe_value(guessed_car["Cylinders"]), safe_value(correct_car["Cylinders"]), "cylinders"),
+            "horsepower": compare_value(safe_value(guessed_car["Horsepower"]), safe_value(correct_car["Horsepower"]), "number"),
+            "fuel_capacity_gal": compare_value(safe_value(guessed_car["Fuel capacity (gal)"]), safe_value(correct_car["Fuel capacity (gal)"]), "number"),
+            "fuel_capacity_liters": compare_value(safe_value(guessed_car["Fuel capacity (L)"]), safe_value(correct_car["Fuel capacity (L)"]), "number"),
+            "country": compare_value(safe_value(guessed_car["Country"]), safe_value(correct_car["Country"]), "string")
+        },
+        "correct_name": correct_name if is_correct else None
+    }
+
+
+def compare_cars(guessed, correct):
+    """Per-column comparison of one guessed CarRecord against the correct one"""
+    comparisons = {}
+    for (key, _, kind), value, g_val, c_val in zip(main.COMPARED_FIELDS, guessed.values, guessed.parsed, correct.parsed):
+        if g_val is None or c_val is None:
+            status = "unknown"
+        elif kind == "string":
+            status = "correct" if g_val == c_val else "incorrect"
+        elif g_val == c_val:
+            status = "correct"
+        elif g_val < c_val:
+            status = "lower"
+        else:
+            status = "higher"
+        comparisons[key] = {"status": status, "value": value}
+    return comparisons
+
+
+def indexed_check(guessed_car_name, correct_car):
+    """The same result via car_index and the pre-parsed records"""
+    guessed = main.car_index.get(main.normalize_car_name(guessed_car_name))
+    if guessed is None:
+        return {"error": "Car not found"}
+    correct = main.record_for(correct_car)
+    is_correct = guessed.key == correct.key
+    return {
+        "is_correct": is_correct,
+        "make": guessed.doc["Make"],
+        "make_correct": guessed.make_key == correct.make_key,
+        "comparisons": compare_cars(guessed, correct),
+        "correct_name": f"{correct_car['Make']} {correct_car['Model']}" if is_correct else None
+    }
+
+
+def table_check(guessed_car_name, correct_car):
+    """The same result looked up in the answer's GuessTable"""
+    return json.loads(table_lookup(guessed_car_name, correct_car))
+
+
+def table_lookup(guessed_car_name, correct_car):
+    """What /check-guess does per request: find the answer's table, then the guess in it"""
+    return main.guess_body(main.guess_table(main.record_for(correct_car)), guessed_car_name)
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    correct_car = main.get_car_for_day(100)
+    names = [f"{doc['Make']} {doc['Model']}" for doc in main.documents] + ["Not A Car"]
+
+    mismatches = []
+    for name in names:
+        expected = reference_check(main.documents, name, correct_car)
+        if expected != indexed_check(name, correct_car) or expected != table_check(name, correct_car):
+            mismatches.append(name)
+
+    ref_time = timed(lambda: [reference_check(main.documents, name, correct_car) for name in names], args.repeat)
+    new_time = timed(lambda: [indexed_check(name, correct_car) for name in names], args.repeat)
+    build_time = timed(lambda: main.GuessTable(main.record_for(correct_car)), args.repeat)
+    table_time = timed(lambda: [table_lookup(name, correct_car) for name in names], args.repeat)
+    per_ref = ref_time / len(names) * 1e6
+    per_new = new_time / len(names) * 1e6
+    per_table = table_time / len(names) * 1e6
+    print(f"linear scan: {per_ref:8.1f} us/guess")
+    print(f"indexed:     {per_new:8.1f} us/guess  ({ref_time / new_time:.0f}x)")
+    print(f"table:       {per_table:8.1f} us/guess  ({ref_time / table_time:.0f}x), "
+          f"built in {build_time * 1000:.1f} ms per day")
+    if mismatches:
+        print(f"FAIL: results differ for {mismatches[:5]}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,168 @@
+"""Compare the clue renderer (render.ClueRenderer) against the old per-pixel blend loop.
+
+Runs offline on a synthetic 800x600 image in RGB, RGBA and palette ("P")
+mode. Exits non-zero if any variant differs from the reference loop by
+more than TOLERANCE levels per channel, or if the exact output no longer
+matches the digests in golden_clue_variants.json.
+
+The renderer desaturates before resampling, where the loop resampled
+first, so opaque sources move by up to two levels; the tolerance only
+catches gross drift. The golden digests pin the output bit for bit, so any
+change to the rendering shows up. They depend on Pillow's resampling code:
+on a Pillow version other than the recorded one a mismatch is reported but
+doesn't fail. Regenerate them with --update-golden after an intended change.
+
+Palette sources are a stated difference: Pillow resizes "P" images with
+nearest neighbour whatever filter is asked for, so the reference loop
+gave blocky zooms for them, while the renderer converts to RGB first and
+resamples with LANCZOS. For "P" the renderer is therefore compared with
+the reference loop run on the RGB conversion of the same image.
+
+    python benchmarks/bench_clue_variants.py [--repeat N] [--update-golden]
+"""
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+
+import PIL
+from PIL import Image, ImageChops
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+with contextlib.redirect_stdout(io.StringIO()):
+    import main
+from fixtures import make_test_image
+from render import ClueRenderer
+
+# Largest allowed per-channel difference from the reference loop
+TOLERANCE = 2
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), "golden_clue_variants.json")
+
+
+def reference_clue_variants(original_img, num_guesses=7):
+    """The original per-pixel implementation, kept here as the golden reference"""
+    variants = []
+    orig_width, orig_height = original_img.size
+    crop_width_orig = int(orig_width * 0.5)
+    crop_height_orig = int(orig_height * 0.5)
+    left_orig = (orig_width - crop_width_orig) // 2
+    top_orig = (orig_height - crop_height_orig) // 2
+    cropped_original = original_img.crop((left_orig, top_orig, left_orig + crop_width_orig, top_orig + crop_height_orig))
+
+    for guess_num in range(num_guesses):
+        crop_factor = 0.5 + (guess_num / (num_guesses - 1)) * 0.5
+        crop_orig_width, crop_orig_height = cropped_original.size
+        crop_width = int(crop_orig_width * crop_factor)
+        crop_height = int(crop_orig_height * crop_factor)
+        left = (crop_orig_width - crop_width) // 2
+        top = (crop_orig_height - crop_height) // 2
+        cropped = cropped_original.crop((left, top, left + crop_width, top + crop_height))
+        variant = cropped.resize((crop_orig_width, crop_orig_height), Image.Resampling.LANCZOS)
+        color_intensity = guess_num / (num_guesses - 1)
+
+        variant_rgb = variant.convert("RGB")
+        grayscale_variant = variant_rgb.convert("L")
+        result = Image.new("RGB", variant_rgb.size)
+        pixels_color = variant_rgb.load()
+        pixels_gray = grayscale_variant.load()
+        result_pixels = result.load()
+        for y in range(variant_rgb.size[1]):
+            for x in range(variant_rgb.size[0]):
+                gray_val = pixels_gray[x, y]
+                color_val = pixels_color[x, y]
+                r = int(gray_val * (1 - color_intensity) + color_val[0] * color_intensity)
+                g = int(gray_val * (1 - color_intensity) + color_val[1] * color_intensity)
+                b = int(gray_val * (1 - color_intensity) + color_val[2] * color_intensity)
+                result_pixels[x, y] = (r, g, b)
+        variants.append(result)
+    return variants
+
+
+def max_difference(a, b):
+    """Largest per-channel difference between two images"""
+    return max(high for low, high in ImageChops.difference(a, b).getextrema())
+
+
+def digests(variants):
+    """sha256 of each variant's raw RGB pixels"""
+    return [hashlib.sha256(variant.tobytes()).hexdigest() for variant in variants]
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--update-golden", action="store_true", help="rewrite the golden digests from this run")
+    args = parser.parse_args()
+
+    golden = {}
+    if os.path.exists(GOLDEN_PATH):
+        with open(GOLDEN_PATH) as f:
+            golden = json.load(f)
+    same_pillow = golden.get("pillow") == PIL.__version__
+    outputs = {}
+
+    failed = False
+    for mode in ("RGB", "RGBA", "P"):
+        img = make_test_image(mode=mode)
+        new_time, new_variants = timed(lambda: list(ClueRenderer(img, main.maxGuesses).variants()), args.repeat)
+        low_memory_variants = list(ClueRenderer(img, main.maxGuesses, low_memory=True).variants())
+        # See the module docstring for why palette images are compared in RGB
+        reference_img = img.convert("RGB") if mode == "P" else img
+        ref_time, ref_variants = timed(lambda: reference_clue_variants(reference_img, main.maxGuesses), 1)
+
+        diffs = [max_difference(a, b) for a, b in zip(new_variants, ref_variants)]
+        print(f"{mode}:")
+        print(f"  reference loop:  {ref_time * 1000:8.1f} ms")
+        print(f"  vectorized:      {new_time * 1000:8.1f} ms  ({ref_time / new_time:.0f}x)")
+        print(f"  max pixel diff per variant: {diffs} (tolerance {TOLERANCE})")
+        if mode == "P":
+            nearest = [max_difference(a, b) for a, b in zip(new_variants, reference_clue_variants(img, main.maxGuesses))]
+            print(f"  vs the nearest-neighbour reference on the palette image: {nearest} (expected)")
+        if max(diffs) > TOLERANCE:
+            print(f"FAIL: {mode} output drifted from the reference renderer")
+            failed = True
+        if digests(low_memory_variants) != digests(new_variants):
+            print(f"FAIL: {mode} low_memory output differs from the default renderer")
+            failed = True
+
+        outputs[mode] = digests(new_variants)
+        if args.update_golden:
+            continue
+        if mode not in golden.get("variants", {}):
+            print(f"  no golden digests for {mode}; run with --update-golden")
+        elif golden["variants"][mode] != outputs[mode]:
+            changed = [i for i, (a, b) in enumerate(zip(outputs[mode], golden["variants"][mode])) if a != b]
+            if same_pillow:
+                print(f"FAIL: {mode} variants {changed} differ from the golden digests")
+                failed = True
+            else:
+                print(f"  {mode} variants {changed} differ from the golden digests, recorded with "
+                      f"Pillow {golden.get('pillow')} (this is {PIL.__version__}); not failing")
+        else:
+            print("  golden digests: match")
+
+    if args.update_golden:
+        with open(GOLDEN_PATH, "w") as f:
+            json.dump({"pillow": PIL.__version__, "variants": outputs}, f, indent=2)
+            f.write("\n")
+        print(f"Wrote {GOLDEN_PATH}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,177 @@
+"""Time the image fetcher against a local HTTP server.
+
+The server hands out the fixture JPEG with a per-URL delay, plus a few
+broken candidates (a 404, an HTML page, oversized bodies, a truncated
+JPEG), so racing, header checks, full decodes and the byte cap are
+exercised without the network:
+
+    python benchmarks/bench_fetcher.py [--delay 0.2] [--repeat 5]
+
+Compares DDGSFetcher.fetch_first on a candidate list against fetching
+the same candidates one after another, and checks that each broken
+candidate is rejected, including a truncated JPEG ranked first when the
+full decode chooseCar or resolve_image uses is the validator. The same truncated and
+good files are then resolved through LocalFetcher (IMAGE_FETCHER=local:)
+into a temporary image library.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from fixtures import make_test_jpeg  # noqa: E402
+from image_library import (DDGSFetcher, ImageLibrary, LocalFetcher, build_library,  # noqa: E402
+                           check_image_header, decode_image, decode_source_png)
+
+MAX_BYTES = 1024 * 1024
+
+
+def make_handler(jpeg, delay):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def send_body(self, body, content_type, status=200, sized=True):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            if sized:
+                self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # the client gave up on an oversized body, as it should
+
+        def do_GET(self):
+            time.sleep(delay)
+            if self.path.startswith("/image"):
+                self.send_body(jpeg, "image/jpeg")
+            elif self.path == "/html":
+                self.send_body(b"<html>not an image</html>", "text/html")
+            elif self.path == "/huge":
+                self.send_body(b"\xff" * (MAX_BYTES + 1), "image/jpeg")
+            elif self.path == "/unsized":
+                # No Content-Length: only the byte cap while streaming stops it
+                self.send_body(b"\xff" * (MAX_BYTES + 1), "image/jpeg", sized=False)
+            elif self.path == "/truncated":
+                # A valid header, but the body stops halfway
+                self.send_body(jpeg[:len(jpeg) // 2], "image/jpeg")
+            elif self.path == "/garbage":
+                self.send_body(b"\x00" * 1000, "image/jpeg")
+            else:
+                self.send_body(b"not found", "text/plain", status=404)
+
+    return Handler
+
+
+def check_local(jpeg):
+    """Build a library from a local directory whose first candidate is truncated; True if it worked"""
+    root = tempfile.mkdtemp(prefix="supercardle-local-")
+    try:
+        images = os.path.join(root, "images")
+        os.makedirs(images)
+        with open(os.path.join(images, "bmw-m3-1.jpg"), "wb") as f:
+            f.write(jpeg[:len(jpeg) // 2])
+        with open(os.path.join(images, "bmw-m3-2.jpg"), "wb") as f:
+            f.write(jpeg)
+        library = ImageLibrary(os.path.join(root, "library"))
+        car = {"Make": "BMW", "Model": "M3", "Year": 2021}
+        start = time.perf_counter()
+        failed = build_library([car], LocalFetcher(images), library, workers=1, progress=lambda line: None)
+        elapsed = time.perf_counter() - start
+        found = library.get(car)
+        if failed or found is None or not found[0].endswith("bmw-m3-2.jpg"):
+            print(f"FAIL: LocalFetcher library build picked {found and found[0]}")
+            return False
+        print(f"local:       {elapsed * 1000:8.1f} ms  (truncated first file skipped)")
+        return True
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--delay", type=float, default=0.2, help="Server latency per request, seconds")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    jpeg = make_test_jpeg()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(jpeg, args.delay))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    fetcher = DDGSFetcher(workers=4, timeout=(2, 5), max_bytes=MAX_BYTES)
+    failed = 0
+
+    for path in ("/missing", "/html", "/huge", "/unsized", "/garbage"):
+        try:
+            check_image_header(fetcher.fetch(base + path))
+        except Exception as e:
+            print(f"{path:10s} rejected: {e}")
+        else:
+            print(f"FAIL: {path} was accepted")
+            failed += 1
+
+    # The only good candidate is ranked last
+    urls = [base + path for path in ("/missing", "/html", "/huge", "/image")]
+
+    def sequential():
+        for url in urls:
+            try:
+                data = fetcher.fetch(url)
+                check_image_header(data)
+                return url, data
+            except Exception:
+                continue
+        return None
+
+    seq_time, seq_found = best_of(sequential, args.repeat)
+    race_time, race_found = best_of(lambda: fetcher.fetch_first(urls), args.repeat)
+    print(f"sequential:  {seq_time * 1000:8.1f} ms")
+    print(f"fetch_first: {race_time * 1000:8.1f} ms  ({seq_time / race_time:.1f}x)")
+    if race_found is None or seq_found is None or race_found[0] != seq_found[0] or race_found[1] != seq_found[1]:
+        print("FAIL: fetch_first picked a different candidate")
+        failed += 1
+
+    # Ranking wins over speed: both candidates are good, the first is kept
+    found = fetcher.fetch_first([base + "/image-a", base + "/image-b"])
+    if found is None or not found[0].endswith("/image-a"):
+        print("FAIL: fetch_first did not keep the best-ranked candidate")
+        failed += 1
+
+    # A truncated image passes the header check, so it needs a full decode to
+    # lose to the next-ranked candidate: decode_image is what chooseCar uses,
+    # decode_source_png what resolve_image uses
+    for validate in (decode_image, decode_source_png):
+        found = fetcher.fetch_first([base + "/truncated", base + "/image"], validate=validate)
+        if found is None or not found[0].endswith("/image"):
+            print(f"FAIL: a truncated first candidate was not skipped by {validate.__name__}")
+            failed += 1
+        else:
+            print(f"{'/truncated':10s} rejected by {validate.__name__}")
+    if decode_image(jpeg) is not jpeg:
+        print("FAIL: decode_image did not hand back the downloaded bytes")
+        failed += 1
+
+    if not check_local(jpeg):
+        failed += 1
+    server.shutdown()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
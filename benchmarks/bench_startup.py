@@ -0,0 +1,77 @@
+"""Compare loading the car data from the compiled catalog against pandas.
+
+Each variant runs in a fresh interpreter so import time is included, and
+the reported time and peak RSS are the best of N runs. Also checks that
+both produce the same records. The pandas variant is skipped if pandas
+isn't installed.
+
+    python benchmarks/bench_startup.py [--repeat N]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+PANDAS_LOAD = """
+import json, math, pandas as pd
+df = pd.read_csv("car_data.csv").drop_duplicates(subset=["Make", "Model"], keep="first")
+docs = [{k: None if isinstance(v, float) and math.isnan(v) else v for k, v in doc.items()}
+        for doc in df.to_dict("records")]
+print(json.dumps(docs, default=int))
+"""
+
+CATALOG_LOAD = """
+import json
+from catalog import load_catalog
+print(json.dumps(load_catalog("car_data.csv", "car_data.catalog").records()))
+"""
+
+
+def run(code):
+    """(wall seconds, peak RSS in MB, stdout) for one fresh interpreter"""
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-c", code], cwd=ROOT, stdout=subprocess.PIPE)
+    out = proc.stdout.read()
+    _, status, usage = os.wait4(proc.pid, 0)
+    elapsed = time.perf_counter() - start
+    proc.stdout.close()
+    if os.waitstatus_to_exitcode(status) != 0:
+        raise RuntimeError("load failed")
+    return elapsed, usage.ru_maxrss / 1024, out
+
+
+def best_of(code, repeat):
+    results = [run(code) for _ in range(repeat)]
+    return min(r[0] for r in results), results[-1][1], results[-1][2]
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    # Make sure the catalog exists so the timing doesn't include compiling it
+    subprocess.run([sys.executable, "catalog.py"], cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+
+    cat_time, cat_rss, cat_out = best_of(CATALOG_LOAD, args.repeat)
+    print(f"catalog: {cat_time * 1000:8.1f} ms  peak RSS {cat_rss:6.1f} MB")
+
+    try:
+        import pandas  # noqa: F401
+    except ImportError:
+        print("pandas:  not installed, skipped")
+        return 0
+    pd_time, pd_rss, pd_out = best_of(PANDAS_LOAD, args.repeat)
+    print(f"pandas:  {pd_time * 1000:8.1f} ms  peak RSS {pd_rss:6.1f} MB  ({pd_time / cat_time:.0f}x slower)")
+    if json.loads(cat_out) != json.loads(pd_out):
+        print("FAIL: catalog records differ from pandas")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
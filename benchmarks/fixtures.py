@@ -0,0 +1,135 @@
+"""Offline fixtures shared by the benchmarks.
+
+Synthetic images, plus stand-ins for the ``ddgs`` and ``requests`` modules
+so that image search and download never touch the network. Install the
+stubs before importing main.
+"""
+import io
+import random
+import sys
+import types
+
+from PIL import Image, ImageFilter
+
+
+def make_test_image(size=(800, 600), seed=0, mode="RGB"):
+    """Deterministic photo-like test image: gradients plus blurred noise.
+
+    ``mode`` "P" gives an adaptive-palette copy (like many PNG/GIF
+    downloads) and "RGBA" adds a gradient alpha channel.
+    """
+    rng = random.Random(seed)
+    width, height = size
+    noise = Image.frombytes("RGB", size, bytes(rng.getrandbits(8) for _ in range(width * height * 3)))
+    noise = noise.filter(ImageFilter.GaussianBlur(3))
+    gradient = Image.merge("RGB", (
+        Image.linear_gradient("L").resize(size),
+        Image.linear_gradient("L").rotate(90).resize(size),
+        Image.radial_gradient("L").resize(size),
+    ))
+    img = Image.blend(gradient, noise, 0.5)
+    if mode == "P":
+        return img.convert("P", palette=Image.Palette.ADAPTIVE)
+    if mode == "RGBA":
+        img.putalpha(Image.linear_gradient("L").rotate(45).resize(size))
+    return img
+
+
+def make_test_jpeg(size=(1000, 700), seed=0):
+    """A test image encoded the way search results usually are"""
+    buffer = io.BytesIO()
+    make_test_image(size, seed).save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+class FakeResponse:
+    """Just enough of requests.Response for the image fetchers"""
+
+    def __init__(self, url, content, status_code=200, content_type="image/jpeg"):
+        self.url = url
+        self.content = content
+        self.status_code = status_code
+        self.headers = {"Content-Type": content_type, "Content-Length": str(len(content))}
+
+    def iter_content(self, chunk_size=65536):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            import requests
+            raise requests.HTTPError(f"{self.status_code} for {self.url}")
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class NetworkStub:
+    """Serves every search with fixture URLs and every download with fixture bytes.
+
+    ``calls`` counts searches and downloads, so benchmarks can check that
+    caching actually avoided the network.
+    """
+
+    def __init__(self, image_bytes, results_per_query=3):
+        self.image_bytes = image_bytes
+        self.results_per_query = results_per_query
+        self.calls = {"search": 0, "get": 0}
+
+    def search(self, query, max_results=1):
+        self.calls["search"] += 1
+        count = min(max_results, self.results_per_query)
+        return [{"image": f"http://fixtures.invalid/{i}/{query}"} for i in range(count)]
+
+    def get(self, url, *args, **kwargs):
+        self.calls["get"] += 1
+        return FakeResponse(url, self.image_bytes)
+
+    def install(self):
+        """Replace ddgs and requests in sys.modules with this stub"""
+        stub = self
+
+        class DDGS:
+            def __init__(self, *args, **kwargs):
+                pass
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                pass
+
+            def images(self, query, max_results=1, **kwargs):
+                return stub.search(query, max_results)
+
+        class Session:
+            def __init__(self):
+                self.headers = {}
+
+            def get(self, url, *args, **kwargs):
+                return stub.get(url, *args, **kwargs)
+
+            def mount(self, prefix, adapter):
+                pass
+
+            def close(self):
+                pass
+
+        class HTTPError(IOError):
+            pass
+
+        requests_module = types.ModuleType("requests")
+        requests_module.get = stub.get
+        requests_module.Session = Session
+        requests_module.HTTPError = HTTPError
+        requests_module.RequestException = IOError
+        requests_module.adapters = types.SimpleNamespace(HTTPAdapter=lambda *args, **kwargs: None)
+        sys.modules["requests"] = requests_module
+        sys.modules["ddgs"] = types.SimpleNamespace(DDGS=DDGS)
+        return self
@@ -0,0 +1,186 @@
+"""Measure request throughput as the number of server workers grows.
+
+For each worker count, starts ``main.py serve --workers N`` on a free port,
+waits until it serves the current day, then hammers a mix of routes
+(index, clue images, day info, car details, guess checks) from several
+client processes over keep-alive connections and reports requests/second
+and latency percentiles.
+
+With --offline the server gets a temporary state directory and an image
+library holding a synthetic image for today's candidates, so no network
+access is needed. Without it, the server uses its normal state and must be
+able to produce today's car.
+
+    python benchmarks/load_test.py [--workers 1 2 4] [--duration 10] [--clients 4] [--connections 16] [--offline]
+"""
+import argparse
+import contextlib
+import http.client
+import io
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, ROOT)
+with contextlib.redirect_stdout(io.StringIO()):
+    import main
+from fixtures import make_test_image
+from render import encode_png
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def seed_offline_state(state_dir):
+    """A state directory plus an image library covering today's candidates"""
+    library = main.ImageLibrary(os.path.join(state_dir, "image_library"))
+    png = encode_png(make_test_image())
+    candidates = main.day_schedule.candidates(main.get_current_day_number())
+    for _, car in zip(range(main.day_schedule.depth), candidates):
+        library.add(car, "synthetic", png)
+    library.save_manifest()
+    return {"STATE_DIR": state_dir, "IMAGE_LIBRARY": library.root, "IMAGE_LIBRARY_ONLY": "1"}
+
+
+def request_mix():
+    """(method, path, body) tuples in the proportions a player produces"""
+    names = [f"{doc['Make']} {doc['Model']}" for doc in main.selectable_documents]
+    rng = random.Random(0)
+    mix = [("GET", "/", None), ("GET", "/day-info", None)]
+    mix += [("GET", f"/clue.png?guess={guess}", None) for guess in range(main.maxGuesses)]
+    for name in rng.sample(names, 8):
+        mix.append(("GET", f"/car/{name}".replace(" ", "%20"), None))
+        mix.append(("POST", "/check-guess", json.dumps({"car_name": name})))
+    return mix
+
+
+def start_server(port, workers, env):
+    proc = subprocess.Popen(
+        [sys.executable, "main.py", "serve", "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers)],
+        cwd=ROOT, env={**os.environ, **env}, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("server exited during startup")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+            # The first / generates (or loads) the current day
+            conn.request("GET", "/")
+            if conn.getresponse().status == 200:
+                conn.close()
+                return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("server did not become ready")
+
+
+def client_process(port, mix, connections, duration, results):
+    """One client process: several threads, each with a keep-alive connection"""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def run(seed):
+        rng = random.Random(seed)
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        local = []
+        failed = 0
+        while time.perf_counter() < stop_at:
+            method, path, body = rng.choice(mix)
+            headers = {"Content-Type": "application/json"} if body else {}
+            start = time.perf_counter()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 400:
+                    failed += 1
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+                continue
+            local.append(time.perf_counter() - start)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=run, args=(os.getpid() * 1000 + i,)) for i in range(connections)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    results.put((latencies, errors[0]))
+
+
+def measure(port, mix, clients, connections, duration):
+    results = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=client_process, args=(port, mix, connections, duration, results))
+             for _ in range(clients)]
+    for p in procs:
+        p.start()
+    latencies, errors = [], 0
+    for _ in procs:
+        lat, err = results.get()
+        latencies.extend(lat)
+        errors += err
+    for p in procs:
+        p.join()
+    latencies.sort()
+
+    def pct(q):
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000 if latencies else float("nan")
+
+    return {"requests": len(latencies), "rps": len(latencies) / duration, "errors": errors,
+            "p50_ms": pct(0.50), "p99_ms": pct(0.99)}
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--clients", type=int, default=4, help="Client processes")
+    parser.add_argument("--connections", type=int, default=16, help="Connections per client process")
+    parser.add_argument("--offline", action="store_true", help="Use a temporary state dir and synthetic images")
+    args = parser.parse_args()
+
+    state_dir = tempfile.mkdtemp(prefix="supercardle-load-") if args.offline else None
+    env = seed_offline_state(state_dir) if state_dir else {}
+    mix = request_mix()
+    baseline = None
+    try:
+        for workers in args.workers:
+            port = free_port()
+            server = start_server(port, workers, env)
+            try:
+                stats = measure(port, mix, args.clients, args.connections, args.duration)
+            finally:
+                server.terminate()
+                server.wait()
+            baseline = baseline or stats["rps"]
+            print(f"workers={workers:<3} {stats['rps']:9.0f} req/s  ({stats['rps'] / baseline:4.1f}x)  "
+                  f"p50 {stats['p50_ms']:6.1f} ms  p99 {stats['p99_ms']:7.1f} ms  errors {stats['errors']}")
+    finally:
+        if state_dir:
+            shutil.rmtree(state_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,270 @@
+"""Offline benchmark suite: micro-benchmarks plus replayed HTTP traffic.
+
+Everything runs in-process against a temporary state directory, with the
+ddgs and requests modules replaced by local fixtures (see fixtures.py), so
+results don't depend on the network and can be compared between commits:
+
+    python benchmarks/suite.py --output before.json
+    ... change things ...
+    python benchmarks/suite.py --output after.json --compare before.json
+
+Micro-benchmarks: clue variant rendering (all of them, and guess 0 alone),
+the full render + encode of a day, guess comparison (direct and via the
+day's GuessTable), building a GuessTable, day -> car lookup and catalog
+loading.
+
+HTTP scenarios (driven through httpx's ASGI transport, no sockets):
+  reset_burst     many players hit / at once right after the reset, with
+                  no cached day; also checks only one image search happened
+  player_session  players load the page, then fetch clue.png?guess=0..6
+                  with a /check-guess between each
+  history         players browse archived days: /history-day and
+                  /history-clue.png, first cold then warm
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.realpath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+
+from fixtures import NetworkStub, make_test_image, make_test_jpeg  # noqa: E402
+
+
+def summarize(samples, per=1):
+    """Stats for a list of timings in seconds, optionally per operation"""
+    samples = sorted(s / per for s in samples)
+    return {
+        "unit": "s",
+        "n": len(samples),
+        "best": samples[0],
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+    }
+
+
+def repeat(fn, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+    if not latencies:
+        return {}
+
+    def pct(q):
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+
+    return {"p50_ms": pct(0.50), "p95_ms": pct(0.95), "p99_ms": pct(0.99), "max_ms": latencies[-1] * 1000}
+
+
+def run_micro(main, runs):
+    import catalog as catalog_module
+    import render
+
+    results = {}
+    img = make_test_image()
+    results["create_clue_variants"] = summarize(
+        repeat(lambda: render.create_clue_variants(img, main.maxGuesses), runs))
+    results["create_clue_variants_low_memory"] = summarize(
+        repeat(lambda: list(render.ClueRenderer(img, main.maxGuesses, low_memory=True).variants()), runs))
+    results["render_clue_variant_0"] = summarize(
+        repeat(lambda: render.ClueRenderer(img, main.maxGuesses).variant(0), runs))
+
+    jpeg = make_test_jpeg()
+    results["render_day_images"] = summarize(
+        repeat(lambda: render.render_day_images(jpeg, main.maxGuesses), max(1, runs // 2)))
+
+    day = main.get_current_day_number()
+    correct = main.record_for(main.get_car_for_day(day))
+    names = [main.normalize_car_name(f"{doc['Make']} {doc['Model']}") for doc in main.documents]
+
+    results["check_guess_table"] = summarize(
+        repeat(lambda: [main.guess_body(main.guess_table(main.record_for(correct.doc)), name) for name in names], runs),
+        per=len(names))
+    results["guess_table_build"] = summarize(repeat(lambda: main.GuessTable(correct), runs))
+
+    days = range(max(main.day_schedule.first_day, day - 500), day + 500)
+    results["get_car_for_day"] = summarize(
+        repeat(lambda: [main.get_car_for_day(d) for d in days], runs), per=len(days))
+    # Days past the precomputed table fall back to shuffling
+    far = main.day_schedule.last_day + 1
+    results["get_car_for_day_unscheduled"] = summarize(
+        repeat(lambda: main.day_schedule._shuffled_indices(far), runs))
+
+    catalog_path = os.path.join(ROOT, "car_data.catalog")
+    catalog_module.load_catalog(os.path.join(ROOT, "car_data.csv"), catalog_path)
+    results["catalog_load"] = summarize(
+        repeat(lambda: catalog_module.read_catalog(catalog_path).records(), runs))
+    return results
+
+
+async def replay(client, requests, concurrency):
+    """Issue (method, url, body) requests with bounded concurrency; per-route latencies"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = {}
+    errors = 0
+
+    async def one(method, url, body):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.request(method, url, json=body)
+            elapsed = time.perf_counter() - start
+        if response.status_code >= 400:
+            errors += 1
+        route = url.split("?")[0]
+        route = "/" + route.split("/")[1] if route.count("/") > 1 else route
+        latencies.setdefault(f"{method} {route}", []).append(elapsed)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(*request) for request in requests))
+    wall = time.perf_counter() - start
+    total = sum(len(v) for v in latencies.values())
+    return {
+        "requests": total,
+        "errors": errors,
+        "wall_s": wall,
+        "rps": total / wall if wall else 0.0,
+        **percentiles([x for v in latencies.values() for x in v]),
+        "routes": {route: {"n": len(v), **percentiles(v)} for route, v in sorted(latencies.items())},
+    }
+
+
+def player_requests(main, players, rng):
+    names = [f"{doc['Make']} {doc['Model']}" for doc in main.selectable_documents]
+    day = main.get_current_day_number()
+    requests = []
+    for _ in range(players):
+        requests += [("GET", "/", None), ("GET", "/day-info", None), ("GET", "/cars", None)]
+        for guess in range(main.maxGuesses):
+            requests.append(("GET", f"/clue.png?day={day}&guess={guess}", None))
+            requests.append(("POST", "/check-guess", {"car_name": rng.choice(names)}))
+        requests.append(("GET", f"/full-image.png?day={day}", None))
+    return requests
+
+
+def history_requests(main, players, days):
+    requests = []
+    for _ in range(players):
+        for day in days:
+            requests.append(("GET", f"/history-day/{day}", None))
+            requests += [("GET", f"/history-clue.png?day={day}&guess={g}", None) for g in range(main.maxGuesses)]
+    return requests
+
+
+async def run_http(main, stub, players, concurrency):
+    import httpx
+
+    rng = random.Random(0)
+    results = {}
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        searches_before = stub.calls["search"]
+        results["reset_burst"] = await replay(client, [("GET", "/", None)] * players, players)
+        results["reset_burst"]["image_searches"] = stub.calls["search"] - searches_before
+
+        results["player_session"] = await replay(client, player_requests(main, players, rng), concurrency)
+
+        current = main.get_current_day_number()
+        days = [current - offset for offset in range(1, 4)]
+        results["history_cold"] = await replay(client, history_requests(main, players, days), concurrency)
+        results["history_warm"] = await replay(client, history_requests(main, players, days), concurrency)
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, previous):
+    """Print the ratio of each headline number to a previous run"""
+    print(f"\nvs {previous['meta'].get('commit')}:")
+    for name, stats in current["micro"].items():
+        old = previous.get("micro", {}).get(name)
+        if old:
+            print(f"  {name:32s} {stats['median'] / old['median']:6.2f}x time")
+    for name, stats in current["http"].items():
+        old = previous.get("http", {}).get(name)
+        if old and old.get("p50_ms"):
+            print(f"  {name:32s} {stats['p50_ms'] / old['p50_ms']:6.2f}x p50  {stats['rps'] / old['rps']:6.2f}x rps")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default="bench_results.json", help="Where to write the JSON results")
+    parser.add_argument("--compare", help="Previous results file to compare against")
+    parser.add_argument("--runs", type=int, default=10, help="Repetitions per micro-benchmark")
+    parser.add_argument("--players", type=int, default=50, help="Simulated players per HTTP scenario")
+    parser.add_argument("--concurrency", type=int, default=32, help="Requests in flight at once")
+    args = parser.parse_args()
+
+    state_dir = tempfile.mkdtemp(prefix="supercardle-bench-")
+    os.environ.update({
+        "STATE_DIR": state_dir,
+        "IMAGE_LIBRARY": os.path.join(state_dir, "image_library"),
+        "DAY_SCHEDULER": "0",
+        "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING"),
+    })
+    stub = NetworkStub(make_test_jpeg()).install()
+    try:
+        import main
+
+        results = {
+            "meta": {
+                "commit": git_commit(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "runs": args.runs,
+                "players": args.players,
+                "concurrency": args.concurrency,
+            },
+            "micro": run_micro(main, args.runs),
+            "http": asyncio.run(run_http(main, stub, args.players, args.concurrency)),
+        }
+        main.io_pool.shutdown()
+        main.render_pool.shutdown()
+    finally:
+        shutil.rmtree(state_dir, ignore_errors=True)
+
+    for name, stats in results["micro"].items():
+        print(f"{name:32s} median {stats['median'] * 1e6:12.1f} us  best {stats['best'] * 1e6:12.1f} us")
+    for name, stats in results["http"].items():
+        print(f"{name:32s} {stats['requests']:6d} req  {stats['rps']:8.0f} req/s  "
+              f"p50 {stats['p50_ms']:7.1f} ms  p99 {stats['p99_ms']:7.1f} ms  errors {stats['errors']}")
+    if "image_searches" in results["http"]["reset_burst"]:
+        print(f"reset burst image searches: {results['http']['reset_burst']['image_searches']}")
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=1)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
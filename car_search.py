@@ -0,0 +1,99 @@
+import bisect
+import re
+
+# Fuzzy matches need at least this Dice similarity of their trigrams
+MIN_SIMILARITY = 0.35
+
+
+def normalize_search(text):
+    """Casefolded words with punctuation dropped: "Mercedes-Benz" -> "mercedes benz" """
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", text.casefold()).split())
+
+
+def trigrams(text):
+    """Trigrams of a compact (space-free) string, padded so short strings have some"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class CarSearch:
+    """Typeahead over "Make Model" names, built once per catalog.
+
+    Matches are ranked in tiers, best first:
+
+    0. the whole name, ignoring case and punctuation
+    1. a prefix of the name
+    2. every query word is a prefix of some word of the name ("bmw m")
+    3. a substring, ignoring spaces and punctuation ("mercedesbenz")
+    4. similar trigrams, for typos ("mercedez")
+
+    Prefixes are found by bisecting sorted name and word lists, substrings
+    and typos through a trigram index; ties go to the shorter name.
+    """
+
+    def __init__(self, names):
+        self.names = list(names)
+        self.normalized = [normalize_search(name) for name in self.names]
+        self.compact = [name.replace(" ", "") for name in self.normalized]
+        self.sorted_names = sorted((name, i) for i, name in enumerate(self.normalized))
+        self.sorted_words = sorted((word, i) for i, name in enumerate(self.normalized) for word in name.split())
+        self.trigram_counts = [len(trigrams(name)) for name in self.compact]
+        self.postings = {}
+        for i, name in enumerate(self.compact):
+            for gram in trigrams(name):
+                self.postings.setdefault(gram, []).append(i)
+
+    @staticmethod
+    def _prefixed(sorted_pairs, prefix):
+        """Indices of the (text, index) pairs whose text starts with prefix"""
+        start = bisect.bisect_left(sorted_pairs, (prefix,))
+        found = set()
+        for text, i in sorted_pairs[start:]:
+            if not text.startswith(prefix):
+                break
+            found.add(i)
+        return found
+
+    def search(self, query, limit=10):
+        """Up to ``limit`` names matching a partial or misspelled query, best first"""
+        query = normalize_search(query)
+        if not query:
+            return []
+        compact = query.replace(" ", "")
+        ranks = {}
+
+        def rank(i, tier, similarity=1.0):
+            key = (tier, -similarity, len(self.names[i]), self.names[i])
+            if i not in ranks or key < ranks[i]:
+                ranks[i] = key
+
+        for i in self._prefixed(self.sorted_names, query):
+            rank(i, 0 if self.normalized[i] == query else 1)
+
+        words = query.split()
+        matches = self._prefixed(self.sorted_words, words[0])
+        for word in words[1:]:
+            matches &= self._prefixed(self.sorted_words, word)
+        for i in matches:
+            rank(i, 2)
+
+        query_grams = trigrams(compact)
+        shared = {}
+        for gram in query_grams:
+            for i in self.postings.get(gram, ()):
+                shared[i] = shared.get(i, 0) + 1
+        if len(compact) < 3:
+            # Too short for trigrams to say much; a scan of the short list is cheap
+            substring_candidates = range(len(self.names))
+        else:
+            substring_candidates = shared
+        for i in substring_candidates:
+            if compact in self.compact[i]:
+                rank(i, 3)
+        for i, count in shared.items():
+            similarity = 2 * count / (len(query_grams) + self.trigram_counts[i])
+            if similarity >= MIN_SIMILARITY:
+                rank(i, 4, similarity)
+
+        best = sorted(ranks, key=ranks.get)[:limit]
+        return [self.names[i] for i in best]
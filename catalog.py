@@ -0,0 +1,205 @@
+"""Compiled car catalog.
+
+``car_data.csv`` is compiled once into a small binary file that the server
+loads with a single read, without importing pandas. Column types follow
+what ``pandas.read_csv`` inferred (int, float or string); missing values
+are stored as missing and come back as None, so no per-field NaN handling
+is needed afterwards.
+
+File layout::
+
+    MAGIC | u32 version | u32 header length | header JSON | column blocks
+
+Column blocks, at the offsets listed in the header:
+
+    int     count x int64
+    float   count x float64 (NaN = missing)
+    str     (count + 1) x uint32 offsets, count presence bytes, UTF-8 data
+
+    python catalog.py [car_data.csv] [car_data.catalog]
+"""
+import csv
+import hashlib
+import json
+import math
+import os
+import struct
+import sys
+from array import array
+
+from archive import atomic_write
+
+MAGIC = b"SCCATLG\0"
+FORMAT_VERSION = 1
+_PREFIX = struct.Struct("<8sII")
+
+# Cells pandas.read_csv treats as missing by default
+NA_VALUES = {
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+}
+
+# Rows are unique on these columns; the first occurrence wins
+UNIQUE_COLUMNS = ("Make", "Model")
+
+
+class Catalog:
+    """Struct-of-arrays view of the catalog: one Python list per column"""
+
+    __slots__ = ("names", "types", "columns", "count")
+
+    def __init__(self, names, types, columns):
+        self.names = names
+        self.types = types
+        self.columns = columns
+        self.count = len(columns[names[0]]) if names else 0
+
+    def records(self):
+        """One dict per row, keyed by column name"""
+        columns = [self.columns[name] for name in self.names]
+        return [dict(zip(self.names, row)) for row in zip(*columns)]
+
+
+def _infer_type(values):
+    present = [v for v in values if v is not None]
+    try:
+        for v in present:
+            int(v)
+        # pandas falls back to float for integer columns with gaps
+        return "int" if len(present) == len(values) else "float"
+    except ValueError:
+        pass
+    try:
+        for v in present:
+            float(v)
+        return "float"
+    except ValueError:
+        return "str"
+
+
+def read_csv(csv_path):
+    """Parse the CSV the way the server used pandas to: typed columns, deduplicated"""
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        names = next(reader)
+        raw_rows = [row + [""] * (len(names) - len(row)) for row in reader if row]
+
+    raw_columns = {name: [None if row[i] in NA_VALUES else row[i] for row in raw_rows]
+                   for i, name in enumerate(names)}
+    types = {name: _infer_type(values) for name, values in raw_columns.items()}
+    columns = {}
+    for name, values in raw_columns.items():
+        if types[name] == "int":
+            columns[name] = [int(v) for v in values]
+        elif types[name] == "float":
+            columns[name] = [None if v is None or math.isnan(float(v)) else float(v) for v in values]
+        else:
+            columns[name] = values
+
+    seen = set()
+    keep = []
+    for i in range(len(raw_rows)):
+        key = tuple(columns[name][i] for name in UNIQUE_COLUMNS)
+        if key not in seen:
+            seen.add(key)
+            keep.append(i)
+    columns = {name: [values[i] for i in keep] for name, values in columns.items()}
+    return Catalog(names, types, columns)
+
+
+def compile_catalog(csv_path, out_path):
+    """Compile a CSV into the binary catalog format"""
+    with open(csv_path, "rb") as f:
+        source_sha256 = hashlib.sha256(f.read()).hexdigest()
+    catalog = read_csv(csv_path)
+
+    blocks = []
+    column_meta = []
+    offset = 0
+    for name in catalog.names:
+        values = catalog.columns[name]
+        kind = catalog.types[name]
+        if kind == "int":
+            block = array("q", values).tobytes()
+        elif kind == "float":
+            block = array("d", [math.nan if v is None else v for v in values]).tobytes()
+        else:
+            encoded = [(v or "").encode("utf-8") for v in values]
+            offsets = array("I", [0])
+            for data in encoded:
+                offsets.append(offsets[-1] + len(data))
+            present = bytes(v is not None for v in values)
+            block = offsets.tobytes() + present + b"".join(encoded)
+        column_meta.append({"name": name, "type": kind, "offset": offset, "length": len(block)})
+        blocks.append(block)
+        offset += len(block)
+
+    header = json.dumps({
+        "count": catalog.count,
+        "byteorder": sys.byteorder,
+        "source_sha256": source_sha256,
+        "columns": column_meta,
+    }).encode("utf-8")
+    atomic_write(out_path, _PREFIX.pack(MAGIC, FORMAT_VERSION, len(header)) + header + b"".join(blocks))
+    return catalog
+
+
+def read_catalog(path, source_sha256=None):
+    """Load a compiled catalog with one read; None if missing, stale or invalid"""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, header_length = _PREFIX.unpack_from(data)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            return None
+        start = _PREFIX.size + header_length
+        header = json.loads(data[_PREFIX.size:start])
+    except (OSError, struct.error, ValueError):
+        return None
+    if header["byteorder"] != sys.byteorder:
+        return None
+    if source_sha256 is not None and header["source_sha256"] != source_sha256:
+        return None
+
+    count = header["count"]
+    view = memoryview(data)
+    names, types, columns = [], {}, {}
+    for meta in header["columns"]:
+        block = view[start + meta["offset"]:start + meta["offset"] + meta["length"]]
+        kind = meta["type"]
+        if kind == "int":
+            values = block.cast("q").tolist()
+        elif kind == "float":
+            values = [None if v != v else v for v in block.cast("d").tolist()]
+        else:
+            offsets_size = (count + 1) * 4
+            offsets = block[:offsets_size].cast("I").tolist()
+            present = block[offsets_size:offsets_size + count]
+            text = bytes(block[offsets_size + count:])
+            values = [text[offsets[i]:offsets[i + 1]].decode("utf-8") if present[i] else None
+                      for i in range(count)]
+        names.append(meta["name"])
+        types[meta["name"]] = kind
+        columns[meta["name"]] = values
+    return Catalog(names, types, columns)
+
+
+def load_catalog(csv_path, catalog_path):
+    """The compiled catalog for a CSV, recompiling it if the CSV has changed"""
+    with open(csv_path, "rb") as f:
+        source_sha256 = hashlib.sha256(f.read()).hexdigest()
+    catalog = read_catalog(catalog_path, source_sha256)
+    if catalog is None:
+        try:
+            catalog = compile_catalog(csv_path, catalog_path)
+        except OSError:
+            catalog = read_csv(csv_path)
+    return catalog
+
+
+if __name__ == "__main__":
+    here = os.path.dirname(os.path.realpath(__file__))
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(here, "car_data.csv")
+    out_path = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(csv_path)[0] + ".catalog"
+    compiled = compile_catalog(csv_path, out_path)
+    print(f"Compiled {compiled.count} cars into {out_path} ({os.path.getsize(out_path)} bytes)")
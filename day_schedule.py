@@ -0,0 +1,111 @@
+import hashlib
+import json
+import random
+from functools import lru_cache
+
+from archive import atomic_write
+
+
+class DaySchedule:
+    """Which car each day uses, plus its fallback candidates.
+
+    A day's order is exactly what ``random.seed(day + seed)`` followed by
+    ``random.shuffle`` used to produce, but it comes from a private Random
+    instance, so the process-global RNG is never touched. The first
+    ``depth`` candidates for every day in ``[first_day, last_day]`` are
+    precomputed into a table, which is persisted next to the catalog and
+    keyed by a catalog fingerprint. Looking a day up is then O(1); days
+    outside the table fall back to computing (and memoizing) the shuffle.
+    """
+
+    FORMAT_VERSION = 1
+
+    def __init__(self, cars, seed, first_day, last_day, depth=8, path=None):
+        self.cars = cars
+        self.seed = seed
+        self.first_day = first_day
+        self.last_day = last_day
+        self.depth = depth
+        self.path = path
+        self.fingerprint = self._fingerprint()
+        self.table = self._load() or self._build()
+
+    def _fingerprint(self):
+        names = "\n".join(f"{car['Make']} {car['Model']}" for car in self.cars)
+        return hashlib.sha256(f"{self.seed}\n{names}".encode("utf-8")).hexdigest()
+
+    def _shuffled_indices(self, day):
+        indices = list(range(len(self.cars)))
+        random.Random(day + self.seed).shuffle(indices)
+        return indices
+
+    def _load(self):
+        if not self.path:
+            return None
+        try:
+            with open(self.path, "rb") as f:
+                data = json.loads(f.read())
+        except (OSError, ValueError):
+            return None
+        if (data.get("version") != self.FORMAT_VERSION
+                or data.get("fingerprint") != self.fingerprint
+                or data.get("depth") != self.depth
+                or data.get("first_day") != self.first_day
+                or data.get("last_day", -1) < self.last_day):
+            return None
+        self.last_day = data["last_day"]
+        return data["days"]
+
+    def _build(self):
+        table = [self._shuffled_indices(day)[:self.depth]
+                 for day in range(self.first_day, self.last_day + 1)]
+        if self.path:
+            data = {
+                "version": self.FORMAT_VERSION,
+                "fingerprint": self.fingerprint,
+                "depth": self.depth,
+                "first_day": self.first_day,
+                "last_day": self.last_day,
+                "days": table,
+            }
+            try:
+                atomic_write(self.path, json.dumps(data, separators=(",", ":")).encode("utf-8"))
+            except OSError:
+                pass
+        return table
+
+    @lru_cache(maxsize=256)
+    def _full_order(self, day):
+        return self._shuffled_indices(day)
+
+    def _head(self, day):
+        if self.first_day <= day <= self.last_day:
+            return self.table[day - self.first_day]
+        return self._full_order(day)[:self.depth]
+
+    def car_for_day(self, day):
+        """The car a day is scored against"""
+        if not self.cars:
+            return None
+        return self.cars[self._head(day)[0]]
+
+    def cars_for_days(self, first, last):
+        """(day, car) for every day in [first, last], reading the table in one slice"""
+        if not self.cars:
+            return
+        day = first
+        if self.first_day <= first <= self.last_day:
+            for head in self.table[first - self.first_day:min(last, self.last_day) - self.first_day + 1]:
+                yield day, self.cars[head[0]]
+                day += 1
+        for day in range(day, last + 1):
+            yield day, self.car_for_day(day)
+
+    def candidates(self, day):
+        """Every car for a day in preference order, for image-search fallback"""
+        head = self._head(day)
+        for index in head:
+            yield self.cars[index]
+        if len(head) < len(self.cars):
+            for index in self._full_order(day)[len(head):]:
+                yield self.cars[index]
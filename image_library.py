@@ -0,0 +1,290 @@
+import abc
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from PIL import Image
+
+from archive import atomic_write
+from render import load_source_image
+
+logger = logging.getLogger(__name__)
+
+# Downloads are capped so a bogus search result can't eat memory or time
+MAX_IMAGE_BYTES = 15 * 1024 * 1024
+FETCH_TIMEOUT = (5, 15)  # connect, read (seconds)
+FETCH_DEADLINE = 30  # whole download (seconds)
+
+# Content types servers commonly send for images besides image/*
+GENERIC_CONTENT_TYPES = ("", "application/octet-stream", "binary/octet-stream")
+
+
+def search_query(car):
+    """The image search query used for a catalog row"""
+    year = car.get("Year", "")
+    return f'"{car["Make"]} {car["Model"]}" {year}'
+
+
+def car_slug(car):
+    return re.sub(r"[^a-z0-9]+", "-", f"{car['Make']} {car['Model']}".lower()).strip("-")
+
+
+def check_image_header(data):
+    """Raise unless the bytes start like an image Pillow can open (no full decode)"""
+    Image.open(BytesIO(data))
+
+
+class ImageFetcher(abc.ABC):
+    """Where candidate images come from: a search step and a download step"""
+
+    # Downloads in flight at once, across every fetch_first call
+    workers = 4
+    _pool = None
+    _pool_lock = threading.Lock()
+
+    @abc.abstractmethod
+    def search(self, query, max_results=1):
+        """Return candidate image URLs for a query"""
+
+    @abc.abstractmethod
+    def fetch(self, url, cancelled=None) -> bytes:
+        """Download one candidate, giving up early once ``cancelled`` is set"""
+
+    def _executor(self):
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="fetch")
+            return self._pool
+
+    def _fetch_checked(self, url, cancelled, validate):
+        data = self.fetch(url, cancelled)
+        if validate is None:
+            check_image_header(data)
+            return data
+        if cancelled.is_set():
+            raise ValueError("Cancelled")
+        return validate(data)
+
+    def fetch_first(self, urls, validate=None):
+        """(url, bytes) of the best-ranked candidate that downloads as an image, or None.
+
+        Candidates download concurrently. A candidate only wins once every
+        candidate ranked above it has failed, so the result doesn't depend on
+        which server answered first; the losers are then cancelled.
+
+        By default a candidate only has to start like an image. ``validate``
+        replaces that check: it runs on each download, raises to reject it,
+        and its return value is handed back instead of the bytes.
+        """
+        urls = list(urls)
+        cancelled = threading.Event()
+        futures = [self._executor().submit(self._fetch_checked, url, cancelled, validate) for url in urls]
+        try:
+            for url, future in zip(urls, futures):
+                try:
+                    return url, future.result()
+                except Exception as e:
+                    logger.info("Image invalid: %s: %s", url, e)
+            return None
+        finally:
+            cancelled.set()
+            for future in futures:
+                future.cancel()
+
+
+class DDGSFetcher(ImageFetcher):
+    """DuckDuckGo image search plus downloads over a pooled HTTP session.
+
+    Downloads are streamed: the status and headers are checked first, and
+    the body is read up to ``max_bytes`` within ``deadline`` seconds.
+    """
+
+    def __init__(self, workers=4, timeout=FETCH_TIMEOUT, deadline=FETCH_DEADLINE, max_bytes=MAX_IMAGE_BYTES):
+        self.workers = workers
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_bytes = max_bytes
+        self._session = None
+
+    def search(self, query, max_results=1):
+        from ddgs import DDGS
+        with DDGS() as ddgs:
+            return [result["image"] for result in ddgs.images(query, max_results=max_results)]
+
+    def session(self):
+        """The shared requests.Session, with a connection pool per download worker"""
+        with self._pool_lock:
+            if self._session is None:
+                import requests
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=self.workers, pool_maxsize=self.workers)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers["User-Agent"] = "Mozilla/5.0 (compatible; supercardle)"
+                self._session = session
+            return self._session
+
+    def fetch(self, url, cancelled=None) -> bytes:
+        started = time.monotonic()
+        with self.session().get(url, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+            if not content_type.startswith("image/") and content_type not in GENERIC_CONTENT_TYPES:
+                raise ValueError(f"Not an image: {content_type}")
+            length = response.headers.get("Content-Length", "")
+            if length.isdigit() and int(length) > self.max_bytes:
+                raise ValueError(f"Image too large: {length} bytes")
+            chunks = []
+            received = 0
+            for chunk in response.iter_content(chunk_size=65536):
+                if cancelled is not None and cancelled.is_set():
+                    raise ValueError("Cancelled")
+                received += len(chunk)
+                if received > self.max_bytes:
+                    raise ValueError(f"Image larger than {self.max_bytes} bytes")
+                if time.monotonic() - started > self.deadline:
+                    raise ValueError(f"Download took longer than {self.deadline}s")
+                chunks.append(chunk)
+        return b"".join(chunks)
+
+
+class LocalFetcher(ImageFetcher):
+    """Serves images from a local directory, for tests and offline runs.
+
+    A query matches files whose name starts with the car's slug, e.g.
+    ``bmw-m3.jpg`` for ``"BMW M3" 2021``.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def search(self, query, max_results=1):
+        name = query.split('"')[1] if query.count('"') >= 2 else query
+        slug = re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+        matches = sorted(f for f in os.listdir(self.root) if f.startswith(slug))
+        return [os.path.join(self.root, f) for f in matches[:max_results]]
+
+    def fetch(self, url, cancelled=None) -> bytes:
+        with open(url, "rb") as f:
+            return f.read()
+
+
+class ImageLibrary:
+    """Local store of one validated, resized source image per car.
+
+    ``manifest.json`` maps each car's slug to its source URL, image file and
+    sha256; images are stored as PNGs already shrunk to at most 800x600.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.manifest_path = os.path.join(root, "manifest.json")
+        self._lock = threading.Lock()
+        self.entries = self._load_manifest()
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, "rb") as f:
+                return json.loads(f.read())
+        except (OSError, ValueError):
+            return {}
+
+    def save_manifest(self):
+        with self._lock:
+            data = json.dumps(self.entries, indent=1, sort_keys=True).encode("utf-8")
+        atomic_write(self.manifest_path, data)
+
+    def __contains__(self, car):
+        return car_slug(car) in self.entries
+
+    def get(self, car):
+        """(source URL, PNG bytes) for a car, or None if it isn't in the library"""
+        entry = self.entries.get(car_slug(car))
+        if entry is None:
+            return None
+        try:
+            with open(os.path.join(self.root, entry["file"]), "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        if hashlib.sha256(data).hexdigest() != entry["sha256"]:
+            return None
+        return entry["url"], data
+
+    def add(self, car, url, png: bytes):
+        slug = car_slug(car)
+        filename = os.path.join("images", f"{slug}.png")
+        atomic_write(os.path.join(self.root, filename), png)
+        with self._lock:
+            self.entries[slug] = {
+                "make": car["Make"],
+                "model": car["Model"],
+                "url": url,
+                "file": filename,
+                "sha256": hashlib.sha256(png).hexdigest(),
+            }
+
+
+def decode_image(data):
+    """Fully decode downloaded image bytes and return them unchanged; raises if they're corrupt.
+
+    Opening only reads the header, and verify() misses truncated JPEGs, so
+    this loads every pixel the way rendering will.
+    """
+    Image.open(BytesIO(data)).load()
+    return data
+
+
+def decode_source_png(data):
+    """Fully decode a downloaded image and return it resized as PNG; raises if it's corrupt"""
+    Image.open(BytesIO(data)).verify()
+    _, png = load_source_image(data)
+    return png
+
+
+def resolve_image(car, fetcher, max_results=3):
+    """Search for a car and return (url, resized PNG) for the first usable result.
+
+    Each candidate is fully decoded while racing, so one whose header is
+    fine but whose body is truncated loses to the next-ranked candidate.
+    """
+    return fetcher.fetch_first(fetcher.search(search_query(car), max_results=max_results),
+                               validate=decode_source_png)
+
+
+def build_library(cars, fetcher, library, workers=4, force=False, progress=print):
+    """Resolve, download, validate, resize and store an image for every car.
+
+    Cars already in the library are skipped unless ``force`` is set, so an
+    interrupted run can simply be restarted. The manifest is saved as it goes.
+    """
+    todo = [car for car in cars if force or car not in library]
+    done = 0
+    failed = []
+
+    def work(car):
+        try:
+            return car, resolve_image(car, fetcher)
+        except Exception:
+            return car, None
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for car, found in pool.map(work, todo):
+            done += 1
+            name = f"{car['Make']} {car['Model']}"
+            if found is None:
+                failed.append(name)
+                progress(f"[{done}/{len(todo)}] {name}: no usable image")
+            else:
+                library.add(car, *found)
+                progress(f"[{done}/{len(todo)}] {name}: ok")
+            if done % 25 == 0:
+                library.save_manifest()
+    library.save_manifest()
+    return failed
@@ -1,13 +1,20 @@
 import logging
-import pandas as pd
 import os
 from datetime import datetime, timezone, timedelta
 from datetime import time as dt_time
 import pytz
 import json
-import pickle
 import re
-logger = logging.getLogger(__name__)
+import hashlib
+import asyncio
+import functools
+import threading
+import time
+import metrics
+from applog import PRODUCTION, RequestIdMiddleware, configure_logging, stop_logging
+
+configure_logging()
+logger = logging.getLogger("supercardle")
 
 SEED = 12345
 
@@ -17,9 +24,11 @@ maxGuesses = 7
 basepath = os.path.dirname(os.path.realpath(__file__))
 base = lambda p: os.path.join(basepath, p)
 
-df = pd.read_csv(base("car_data.csv"))
-df = df.drop_duplicates(subset=['Make', 'Model'], keep='first')
-documents = df.to_dict("records")
+from catalog import load_catalog
+
+# Compiled from car_data.csv on first run (or when the CSV changes); missing values are None
+catalog = load_catalog(base("car_data.csv"), base("car_data.catalog"))
+documents = catalog.records()
 
 # Filter out cars with zeros in any numeric column
 def is_valid_car(car):
@@ -37,9 +46,13 @@ def is_valid_car(car):
 
 selectable_documents = [car for car in documents if is_valid_car(car)]
 
-import random
 from PIL import Image
-import requests
+from archive import CarCache, DayArchive, record_digests
+from artifact_cache import ArtifactCache, LRUCache
+from day_schedule import DaySchedule
+from image_library import DDGSFetcher, ImageLibrary, LocalFetcher, build_library, decode_image, search_query
+from render import render_day_images, supported_formats
+from workers import PoolBusy, WorkerPool
 from io import BytesIO
 
 EST = pytz.timezone('America/New_York')
@@ -67,527 +80,919 @@ def get_current_day_number():
     
     return days + 2
 
-def get_time_until_next_day():
+# Day numbers count from 1 on launch day
+FIRST_DAY = 1
+
+def is_past_day(day):
+    """Whether clients may ask about ``day``: a numbered day that is already over.
+
+    Keeps today's and future answers hidden, and stops junk day numbers from
+    triggering image searches or filling the history archive.
+    """
+    return isinstance(day, int) and FIRST_DAY <= day < get_current_day_number()
+
+def get_next_reset_time():
     now = datetime.now(EST)
     next_reset = now.replace(hour=RESET_TIME.hour, minute=RESET_TIME.minute, second=0, microsecond=0)
     if next_reset <= now:
         next_reset += timedelta(days=1)
-    delta = next_reset - now
+    return next_reset
+
+def get_time_until_next_day():
+    delta = get_next_reset_time() - datetime.now(EST)
     return int(delta.total_seconds())
 
 
+# Day -> car schedule, precomputed for at least the next SCHEDULE_YEARS years.
+# The end is rounded up to a whole year so the saved table stays valid
+# across restarts instead of being rebuilt every day.
+SCHEDULE_YEARS = int(os.environ.get("SCHEDULE_YEARS", "10"))
+day_schedule = DaySchedule(
+    selectable_documents,
+    SEED,
+    first_day=0,
+    last_day=(get_current_day_number() // 366 + SCHEDULE_YEARS + 1) * 366,
+    path=base("day_schedule.json"),
+)
+
+# Pre-resolved source images (see build-image-library), and where to look
+# for images the library doesn't have. Set IMAGE_LIBRARY_ONLY=1 to never
+# touch the network.
+image_library = ImageLibrary(os.environ.get("IMAGE_LIBRARY", base("image_library")))
+# Each search returns IMAGE_CANDIDATES results, downloaded concurrently
+# (at most FETCH_WORKERS at once) with a size cap and timeouts.
+# IMAGE_FETCHER=local:<dir> searches and "downloads" from a local directory
+# instead of DuckDuckGo (see LocalFetcher), e.g. for offline runs.
+IMAGE_CANDIDATES = int(os.environ.get("IMAGE_CANDIDATES", "3"))
+IMAGE_FETCHER = os.environ.get("IMAGE_FETCHER", "ddgs")
+if IMAGE_FETCHER.startswith("local:"):
+    image_fetcher = LocalFetcher(IMAGE_FETCHER[len("local:"):])
+elif IMAGE_FETCHER == "ddgs":
+    image_fetcher = DDGSFetcher(
+        workers=int(os.environ.get("FETCH_WORKERS", "4")),
+        timeout=(float(os.environ.get("FETCH_CONNECT_TIMEOUT", "5")), float(os.environ.get("FETCH_READ_TIMEOUT", "15"))),
+        max_bytes=int(os.environ.get("MAX_IMAGE_MB", "15")) * 1024 * 1024,
+    )
+else:
+    raise ValueError(f"IMAGE_FETCHER must be ddgs or local:<dir>, not {IMAGE_FETCHER!r}")
+IMAGE_LIBRARY_ONLY = os.environ.get("IMAGE_LIBRARY_ONLY", "0") == "1"
+
+# Pools for blocking work, so async handlers never block the event loop.
+# Network and disk I/O run on threads; image rendering is CPU-bound and
+# runs in worker processes (RENDER_POOL=thread keeps it in-process).
+io_pool = WorkerPool(
+    "io",
+    workers=int(os.environ.get("IO_WORKERS", "8")),
+    max_queue=int(os.environ.get("IO_QUEUE", "64")),
+    timeout=float(os.environ.get("IO_TIMEOUT", "120")),
+)
+render_pool = WorkerPool(
+    "render",
+    workers=int(os.environ.get("RENDER_WORKERS", "2")),
+    max_queue=int(os.environ.get("RENDER_QUEUE", "16")),
+    timeout=float(os.environ.get("RENDER_TIMEOUT", "60")),
+    processes=os.environ.get("RENDER_POOL", "process") == "process",
+    initializer=configure_logging,
+)
+
+# Clue encodings stored per variant, at full size and as a small preview.
+# Clients get the first one their Accept header names (AVIF, WebP, JPEG),
+# or PNG. Set CLUE_FORMATS=png to only store the PNGs.
+CLUE_FORMATS = [fmt for fmt in os.environ.get("CLUE_FORMATS", "avif,webp,jpeg,png").split(",")
+                if fmt in supported_formats()]
+if "png" not in CLUE_FORMATS:
+    CLUE_FORMATS.append("png")
+
+# RENDER_LOW_MEMORY=1 renders clues without keeping a grayscale copy of the
+# source alive, trading a little CPU for a smaller render worker
+RENDER_LOW_MEMORY = os.environ.get("RENDER_LOW_MEMORY", "0") == "1"
+
+# Exposed at /metrics. Values are per worker process.
+stage_seconds = metrics.histogram(
+    "supercardle_stage_duration_seconds", "Time spent in each stage of preparing a day", ["stage"])
+cache_requests = metrics.counter(
+    "supercardle_cache_requests_total", "Day lookups by cache and whether the day was already built",
+    ["cache", "result"])
+http_requests = metrics.counter(
+    "supercardle_http_requests_total", "HTTP requests by handler, method and status", ["handler", "method", "status"])
+http_seconds = metrics.histogram(
+    "supercardle_http_request_duration_seconds", "HTTP request latency by handler", ["handler"])
+metrics.gauge(
+    "supercardle_pool_pending", "Calls running or queued per worker pool", ["pool"],
+    callback=lambda: {("io",): io_pool.pending, ("render",): render_pool.pending})
+
+# Where the day state lives. Every worker process must point at the same
+# directory: they coordinate through lock files in it and map its images.
+STATE_DIR = os.environ.get("STATE_DIR", basepath)
+
+# Structured on-disk cache for the current day (header + pre-encoded images)
+car_cache = CarCache(os.path.join(STATE_DIR, "car_cache"))
+
+@stage_seconds.time(stage="cache_read")
 def load_cached_car():
-    print("LOG: load_cached_car() started")
-    cache_file = base("car_cache.pkl")
-    print(f"LOG: Checking cache file: {cache_file}")
-    if os.path.exists(cache_file):
-        print("LOG: Cache file exists")
+    """Return the cache header if it belongs to the current day"""
+    logger.debug("load_cached_car() started")
+    header = car_cache.read_header()
+    if header is None:
+        logger.info("No usable cache header")
+        return None
+    logger.debug("Cached day: %s, current day: %s", header['day_number'], get_current_day_number())
+    if header['day_number'] == get_current_day_number():
+        logger.debug("Cache is valid")
+        return header
+    logger.info("Cache is for a different day")
+    return None
+
+@stage_seconds.time(stage="cache_write")
+def save_car_cache(bundle):
+    logger.debug("save_car_cache() started")
+    header = car_cache.write(bundle.day_number, bundle.car, bundle.full_image_png, bundle.clue_pngs,
+                             bundle.rendition_bodies())
+    logger.info("Saved day %s to the cache", bundle.day_number)
+    return header
+
+@stage_seconds.time(stage="choose_car")
+def chooseCar(day_number=None):
+    """Pick a day's car: the first candidate with a usable image.
+
+    Returns (car, image bytes), or (None, None). Images come from the local
+    image library when it has one for the car; otherwise image_fetcher is
+    asked, unless IMAGE_LIBRARY_ONLY is set.
+    """
+    logger.debug("chooseCar() started")
+    if day_number is None:
+        day_number = get_current_day_number()
+    logger.debug("Day number: %s", day_number)
+    for i, car in enumerate(day_schedule.candidates(day_number)):
+        name = search_query(car)
+        logger.debug("Trying car %d: %s", i + 1, name)
+        stored = image_library.get(car)
+        if stored is not None:
+            url, data = stored
+            logger.info("Selected car from image library: %s %s", car['Make'], car['Model'])
+            return dict(car, url=url), data
+        if IMAGE_LIBRARY_ONLY:
+            continue
         try:
-            with open(cache_file, 'rb') as f:
-                cached_data = pickle.load(f)
-            print(f"LOG: Loaded data, cached day: {cached_data.get('day_number')}, current day: {get_current_day_number()}")
-            if cached_data['day_number'] == get_current_day_number():
-                print("LOG: Cache is valid")
-                return cached_data
-            else:
-                print("LOG: Cache is for different day")
+            logger.debug("Searching images")
+            with stage_seconds.time(stage="image_search"):
+                results = image_fetcher.search(name, max_results=IMAGE_CANDIDATES)
         except Exception as e:
-            print(f"LOG: Error loading cache: {e}")
-            pass
-    else:
-        print("LOG: Cache file does not exist")
-    print("LOG: load_cached_car() returning None")
-    return None
+            logger.warning("Image search failed for %s: %s", name, e)
+            continue
+        logger.debug("Got %d results", len(results))
+        # Candidates are fully decoded while racing, so a truncated one loses
+        # to the next instead of failing the render; the validated bytes are
+        # handed on as-is, so nothing is downloaded twice
+        with stage_seconds.time(stage="image_fetch"):
+            found = image_fetcher.fetch_first(results, validate=decode_image)
+        if found is None:
+            continue
+        url, data = found
+        logger.info("Selected car: %s %s", car['Make'], car['Model'])
+        return dict(car, url=url), data
+    logger.error("No valid car found for day %s", day_number)
+    return None, None
 
-def save_car_cache(car_data, img_data, clue_variants_data):
-    print("LOG: save_car_cache() started")
-    cache_file = base("car_cache.pkl")
-    cache_data = {
-        'day_number': get_current_day_number(),
-        'car': car_data,
-        'img_data': img_data,
-        'clue_variants': clue_variants_data
-    }
-    print(f"LOG: Saving cache to {cache_file}")
-    with open(cache_file, 'wb') as f:
-        pickle.dump(cache_data, f)
-    print("LOG: Cache saved")
-
-def chooseCar() -> dict:
-    print("LOG: chooseCar() started")
-    day_number = get_current_day_number()
-    print(f"LOG: Day number: {day_number}")
-    random.seed(day_number + SEED)
-    print("LOG: Random seed set")
-    
-    shuffled = selectable_documents.copy()
-    print(f"LOG: Shuffling {len(shuffled)} cars")
-    random.shuffle(shuffled)
-    
-    for i, car in enumerate(shuffled):
-        year = car.get("Year", "")
-        name = f'"{car["Make"]} {car["Model"]}" {year}'
-        print(f"LOG: Trying car {i+1}: {name}")
-        from ddgs import DDGS
-        with DDGS() as ddgs:
-            print("LOG: Searching images")
-            results = ddgs.images(name, max_results=1)
-            print(f"LOG: Got {len(results)} results")
-            for result in results:
-                r = result["image"]
-                print(f"LOG: Checking image URL: {r}")
-                try:
-                    print("LOG: Fetching image to verify")
-                    Image.open(BytesIO(requests.get(r).content))
-                    print("LOG: Image is valid")
-                except Exception as e:
-                    print(f"LOG: Image invalid: {e}")
-                    r = None
-                if r:
-                    car["url"] = r
-                    print(f"LOG: Selected car: {car['Make']} {car['Model']}")
-                    return car
-    print("LOG: No valid car found")
-    return None
+def etag_for_digest(digest: str) -> str:
+    """Strong ETag for a blob whose sha256 is already known"""
+    return '"' + digest[:32] + '"'
 
-# Generate clue variants with progressive zoom and color
-def create_clue_variants(original_img, clue_img, num_guesses=7):
-    """Create progressive clue variants with zoom out and color reveal"""
-    print(f"LOG: create_clue_variants() started with {num_guesses} guesses")
-    variants = []
-    
-    # Crop the original image to start at 50% visible area
-    orig_width, orig_height = original_img.size
-    print(f"LOG: Original image size: {orig_width}x{orig_height}")
-    crop_factor_orig = 0.5
-    crop_width_orig = int(orig_width * crop_factor_orig)
-    crop_height_orig = int(orig_height * crop_factor_orig)
-    left_orig = (orig_width - crop_width_orig) // 2
-    top_orig = (orig_height - crop_height_orig) // 2
-    print("LOG: Cropping original to 50%")
-    cropped_original = original_img.crop((left_orig, top_orig, left_orig + crop_width_orig, top_orig + crop_height_orig))
-    
-    # For each guess number (0-indexed), create a variant
-    for guess_num in range(num_guesses):
-        print(f"LOG: Creating variant for guess {guess_num}")
-        # Calculate crop size: guess 0 shows small portion (zoomed in), guess 6 shows full cropped original
-        # Crop size factor from 0.5 (50% of cropped original) to 1.0 (full cropped original)
-        crop_factor = 0.5 + (guess_num / (num_guesses - 1)) * 0.5  # 0.5 to 1.0
-        
-        # Get cropped original dimensions
-        crop_orig_width, crop_orig_height = cropped_original.size
-        
-        # Calculate the crop area from the cropped original
-        crop_width = int(crop_orig_width * crop_factor)
-        crop_height = int(crop_orig_height * crop_factor)
-        
-        # Center the crop
-        left = (crop_orig_width - crop_width) // 2
-        top = (crop_orig_height - crop_height) // 2
-        
-        # Crop the image
-        print("LOG: Cropping variant")
-        cropped = cropped_original.crop((left, top, left + crop_width, top + crop_height))
-        
-        # Scale back to original cropped size for display
-        print("LOG: Resizing variant")
-        variant = cropped.resize((crop_orig_width, crop_orig_height), Image.Resampling.LANCZOS)
-        
-        # Apply color desaturation based on guess number
-        # Guess 0: grayscale, Guess 6: full color
-        color_intensity = guess_num / (num_guesses - 1)  # 0 to 1
-        print(f"LOG: Applying color intensity {color_intensity}")
-        
-        # Convert to RGB if needed
-        variant_rgb = variant.convert("RGB")
-        
-        # Blend grayscale with color
-        grayscale_variant = variant_rgb.convert("L")
-        
-        # Create color image by blending
-        result = Image.new("RGB", variant_rgb.size)
-        pixels_color = variant_rgb.load()
-        pixels_gray = grayscale_variant.load()
-        result_pixels = result.load()
-        
-        print("LOG: Blending pixels")
-        for y in range(variant_rgb.size[1]):
-            for x in range(variant_rgb.size[0]):
-                gray_val = pixels_gray[x, y]
-                color_val = pixels_color[x, y]
-                
-                # Blend: grayscale to color based on intensity
-                r = int(gray_val * (1 - color_intensity) + color_val[0] * color_intensity)
-                g = int(gray_val * (1 - color_intensity) + color_val[1] * color_intensity)
-                b = int(gray_val * (1 - color_intensity) + color_val[2] * color_intensity)
-                
-                result_pixels[x, y] = (r, g, b)
-        
-        variants.append(result)
-        print(f"LOG: Variant {guess_num} created")
-    
-    print("LOG: create_clue_variants() completed")
-    return variants
+class DayBundle:
+    """Everything served for one day, swapped in as a single reference"""
+
+    def __init__(self, day_number, car, full_image_png, clue_pngs, source_digest=None, clue_digests=None,
+                 renditions=(), blobs=None):
+        self.day_number = day_number
+        self.car = car
+        self.full_image_png = full_image_png
+        self.clue_pngs = clue_pngs
+        self.source_digest = source_digest or hashlib.sha256(full_image_png).hexdigest()
+        self.clue_digests = clue_digests or [hashlib.sha256(data).hexdigest() for data in clue_pngs]
+        self.full_image_etag = etag_for_digest(self.source_digest)
+        self.clue_etags = [etag_for_digest(digest) for digest in self.clue_digests]
+        # Other clue encodings, as digests (see DayArchive.put), and their bodies
+        self.renditions = renditions
+        self.blobs = blobs or {}
+        self.nbytes = sum(len(body) for body in self.blobs.values())
+
+    def rendition_bodies(self):
+        """The renditions with bodies in place of digests, for storing elsewhere"""
+        return [{"width": rendition["width"],
+                 "formats": {fmt: [self.blobs[digest] for digest in digests]
+                             for fmt, digests in rendition["formats"].items()}}
+                for rendition in self.renditions]
+
+def bundle_from_store(store, record):
+    """Map the blobs of a cache header or archive manifest into a DayBundle"""
+    blobs = {digest: store.open_blob(digest) for digest in set(record_digests(record))}
+    return DayBundle(
+        record['day_number'],
+        record['car'],
+        blobs[record['source']],
+        [blobs[digest] for digest in record['clues']],
+        record['source'],
+        record['clues'],
+        record.get('renditions', []),
+        blobs,
+    )
+
+def select_clue(clues, renditions, guess, formats, width=None):
+    """Digest and format of the clue encoding to serve a client.
+
+    ``formats`` are those the client accepts, most preferred first. With a
+    ``width``, the narrowest rendition at least that wide is used (or the
+    widest); without, the full size. Days stored before there were
+    renditions only have the full-size PNGs in ``clues``.
+    """
+    renditions = sorted(renditions, key=lambda rendition: rendition["width"])
+    if renditions:
+        chosen = renditions[-1]
+        if width is not None:
+            chosen = next((rendition for rendition in renditions if rendition["width"] >= width), chosen)
+        for fmt in formats:
+            digests = chosen["formats"].get(fmt)
+            if digests:
+                return digests[guess], fmt
+    return clues[guess], "png"
 
 # Global variables for caching
-cached = None
+today = None  # DayBundle currently being served
+pending_day = None  # DayBundle prepared ahead of the next reset
 cache_loaded = False
-clue_variants_loaded = False
 car = None
-img = None
-greyscale = None
-width = None
-height = None
-clue = None
-clue_variants = None
 day_number = None
+generation_lock = threading.Lock()
 
-# Load cache on startup if available
-print("LOG: Starting initial cache load on startup")
-cached = load_cached_car()
-print(f"LOG: load_cached_car() returned: {cached is not None}")
-if cached:
-    print("LOG: Cache found, loading into globals")
+def activate_day(bundle):
+    """Swap in a new day for every route at once"""
+    global today, car, day_number, cache_loaded
+    day_cache.pin(bundle.day_number)
+    day_cache.put(bundle.day_number, bundle, bundle.nbytes)
+    today = bundle
+    car = bundle.car
+    day_number = bundle.day_number
     cache_loaded = True
-    car = cached['car']
-    print(f"LOG: Loaded car: {car.get('Make')} {car.get('Model')}")
-    img = Image.open(BytesIO(cached['img_data']))
-    print("LOG: Loaded image from cache")
-    if 'clue_variants' in cached:
-        clue_variants = cached['clue_variants']
-        clue_variants_loaded = True
-        print("LOG: Loaded clue_variants from cache")
+
+# Recently served days kept mapped in memory, up to DAY_CACHE_MB per worker.
+# The day being served is pinned; history days are evicted LRU-first.
+day_cache = ArtifactCache(int(os.environ.get("DAY_CACHE_MB", "64")) * 1024 * 1024)
+metrics.gauge(
+    "supercardle_day_cache", "In-memory day cache: bytes, budget, entries and hit/miss/eviction counts", ["stat"],
+    callback=lambda: {(stat,): value for stat, value in day_cache.stats().items()})
+
+# Load cache on startup if available
+logger.debug("Starting initial cache load on startup")
+startup_header = load_cached_car()
+if startup_header:
+    try:
+        activate_day(bundle_from_store(car_cache, startup_header))
+        logger.info("Loaded day %s from the cache: %s %s", day_number, car.get('Make'), car.get('Model'))
+    except (OSError, ValueError) as e:
+        logger.warning("Cached images unusable: %s", e)
+if not cache_loaded:
+    logger.info("No cache found, will load on first request")
+
+# On-disk archive of historical days (car, source image, encoded clues)
+HISTORY_CACHE_MAX_BYTES = int(os.environ.get("HISTORY_CACHE_MAX_MB", "512")) * 1024 * 1024
+history_archive = DayArchive(os.path.join(STATE_DIR, "history_cache"), HISTORY_CACHE_MAX_BYTES)
+
+def build_history_day(day):
+    """Find a day's car and image, render its clue variants and archive them"""
+    logger.info("Building day %s", day)
+    chosen, image_data = chooseCar(day)
+    if chosen is None:
+        return None
+    # Resize to max 800x600 and render, to match current day logic
+    img_data, clue_data, renditions, timings = render_pool.call(
+        render_day_images, image_data, maxGuesses, CLUE_FORMATS, RENDER_LOW_MEMORY)
+    for stage, seconds in timings.items():
+        stage_seconds.observe(seconds, stage=stage)
+    with stage_seconds.time(stage="archive_write"):
+        manifest = history_archive.put(day, chosen, img_data, clue_data, renditions)
+    archived_cars[day] = chosen
+    return manifest
+
+# Car each archived day was built with, by day. A built day's car doesn't
+# change, so manifests are only read once for /history-days.
+archived_cars = {}
+
+def archived_car(day):
+    """The car a day was archived with, or None if it hasn't been built"""
+    car = archived_cars.get(day)
+    if car is None:
+        manifest = history_archive.get(day, touch=False)
+        if manifest is not None:
+            car = archived_cars[day] = manifest["car"]
+    return car
+
+def get_history_entry(day):
+    """Archived manifest for a historical day, building it on first use"""
+    manifest = history_archive.get(day)
+    if manifest is not None:
+        cache_requests.inc(cache="history", result="hit")
+        return manifest
+    with history_archive.lock(day):
+        # Another worker may have built it while we waited for the lock
+        manifest = history_archive.get(day)
+        if manifest is not None:
+            cache_requests.inc(cache="history", result="hit")
+            return manifest
+        cache_requests.inc(cache="history", result="miss")
+        return build_history_day(day)
+
+def load_history_bundle(day):
+    """A day's DayBundle via the archive (building it if needed), kept in day_cache"""
+    manifest = get_history_entry(day)
+    if manifest is None:
+        return None
+    bundle = bundle_from_store(history_archive, manifest)
+    day_cache.put(day, bundle, bundle.nbytes)
+    return bundle
+
+class DayState:
+    """Remembers which day is loaded so steady-state requests skip disk I/O.
+
+    The cache is only re-checked once the daily reset has passed, or when
+    the header file's mtime changes (polled at most every ``check_interval``
+    seconds), e.g. because another process regenerated it.
+    """
+
+    def __init__(self, check_interval=1.0):
+        self.check_interval = check_interval
+        self.loaded_day = None
+        self.header_mtime = None
+        self.next_reset = 0.0
+        self.next_check = 0.0
+
+    def is_current(self):
+        now = time.time()
+        if now >= self.next_reset:
+            return False
+        if now < self.next_check:
+            return True
+        self.next_check = now + self.check_interval
+        return car_cache.header_mtime() == self.header_mtime
+
+    def mark_loaded(self, day):
+        self.loaded_day = day
+        self.header_mtime = car_cache.header_mtime()
+        self.next_reset = get_next_reset_time().timestamp()
+        self.next_check = time.time() + self.check_interval
+
+day_state = DayState()
+
+class GenerationBackoff:
+    """Spaces out retries of a day whose car couldn't be generated.
+
+    Generation searches images for up to every catalog car, so retrying a
+    failing day on every scheduler tick or page load would hammer the search
+    provider. After a failure the day is skipped for ``initial`` seconds,
+    doubling per consecutive failure up to ``maximum``.
+    """
+
+    def __init__(self, initial, maximum):
+        self.initial = initial
+        self.maximum = maximum
+        self._failures = {}  # day -> (consecutive failures, next attempt time)
+        self._lock = threading.Lock()
+
+    def ready(self, day):
+        with self._lock:
+            entry = self._failures.get(day)
+        return entry is None or time.time() >= entry[1]
+
+    def failed(self, day):
+        with self._lock:
+            failures = self._failures.get(day, (0, 0))[0] + 1
+            delay = min(self.initial * 2 ** (failures - 1), self.maximum)
+            self._failures[day] = (failures, time.time() + delay)
+        logger.warning("Generating day %s failed (%d in a row), retrying in %ds", day, failures, delay)
+
+    def succeeded(self, day):
+        with self._lock:
+            self._failures.pop(day, None)
+
+generation_backoff = GenerationBackoff(
+    initial=float(os.environ.get("GENERATION_RETRY_SECONDS", "60")),
+    maximum=float(os.environ.get("GENERATION_RETRY_MAX_SECONDS", "3600")),
+)
+
+def generate_day(day):
+    """prepare_day, unless the day failed recently and isn't due for a retry"""
+    if not generation_backoff.ready(day):
+        return None
+    try:
+        bundle = prepare_day(day)
+    except Exception:
+        generation_backoff.failed(day)
+        raise
+    if bundle is None:
+        generation_backoff.failed(day)
     else:
-        clue_variants_loaded = False
-        print("LOG: No clue_variants in cache")
-else:
-    cache_loaded = False
-    clue_variants_loaded = False
-    print("LOG: No cache found, will load on first request")
-print("LOG: Initial cache load complete")
+        generation_backoff.succeeded(day)
+    return bundle
+
+def prepare_day(day):
+    """Choose a day's car, fetch its image and render all clue variants"""
+    logger.info("Preparing day %s", day)
+    # Archived too, so history and other processes can reuse it
+    manifest = get_history_entry(day)
+    if manifest is None:
+        logger.warning("No car found for day %s", day)
+        return None
+    return bundle_from_store(history_archive, manifest)
+
+def take_prepared_day(day):
+    """A bundle for the day prepared earlier, from memory or the archive"""
+    if pending_day is not None and pending_day.day_number == day:
+        return pending_day
+    manifest = history_archive.get(day)
+    if manifest is not None:
+        try:
+            return bundle_from_store(history_archive, manifest)
+        except (OSError, ValueError) as e:
+            logger.warning("Archived day %s unusable: %s", day, e)
+    return None
 
 # Function to delete the cache file
 def delete_cache():
-    cache_file = base("car_cache.pkl")
-    if os.path.exists(cache_file):
-        os.remove(cache_file)
-        print(f"Cache file deleted at {datetime.now(EST)}")
+    car_cache.clear()
+    logger.info("Cache deleted")
 
 
 
 
 # Ensure the cache on-demand: if the cached day doesn't match current day, remove and regenerate
 def ensure_car_cache_current():
-    print("LOG: ensure_car_cache_current() started")
-    global cached, cache_loaded, car, img, greyscale, width, height, clue, clue_variants, day_number, clue_variants_loaded
-    cache_file = base("car_cache.pkl")
-    print(f"LOG: Cache file path: {cache_file}")
-    # If cache exists but for a different day, delete it
-    if os.path.exists(cache_file):
-        print("LOG: Cache file exists, checking if current")
-        try:
-            with open(cache_file, 'rb') as f:
-                cached_data = pickle.load(f)
-            print(f"LOG: Loaded cached data, day_number: {cached_data.get('day_number')}")
-            current_day = get_current_day_number()
-            print(f"LOG: Current day: {current_day}")
-            if cached_data.get('day_number') != current_day:
-                print("LOG: Cache is stale, deleting")
+    # Steady state: same day, cache file untouched
+    if day_state.is_current():
+        return
+    # The file lock makes one worker process generate while the others wait
+    # and then load what it wrote
+    with generation_lock, car_cache.lock():
+        if day_state.is_current():
+            return
+        logger.debug("ensure_car_cache_current() started")
+        current_day = get_current_day_number()
+        logger.debug("Current day: %s", current_day)
+        bundle = None
+        # Only the small header is read to check staleness
+        header = car_cache.read_header()
+        if header is not None and header['day_number'] != current_day:
+            car_cache.clear()
+            logger.info("Removed stale cache for day %s", header['day_number'])
+            header = None
+
+        if header is not None:
+            if today is not None and today.day_number == current_day and today.clue_digests == header['clues']:
+                bundle = today
+            else:
+                logger.debug("Cache is current, loading")
                 try:
-                    os.remove(cache_file)
-                    print(f"Stale cache removed at {datetime.now(EST)}")
-                except Exception as e0:
-                    print(f"LOG: Error deleting stale cache: {e0}")
-                    pass
-                cached = None
-                cache_loaded = False
-                clue_variants_loaded = False
+                    bundle = bundle_from_store(car_cache, header)
+                except (OSError, ValueError) as e1:
+                    logger.warning("Error loading cache: %s", e1)
+                    # Corrupt cache - delete it
+                    car_cache.clear()
+            if bundle is not None:
+                cache_requests.inc(cache="current_day", result="hit")
+
+        # If no current cache, use the day prepared in the background, or build it now
+        if bundle is None:
+            bundle = take_prepared_day(current_day)
+            if bundle is None:
+                if not generation_backoff.ready(current_day):
+                    return
+                logger.info("No prepared day, picking a car")
+                cache_requests.inc(cache="current_day", result="miss")
+                bundle = generate_day(current_day)
             else:
-                print("LOG: Cache is current, loading into globals")
-                # Load into globals if not already
-                cached = cached_data
-                cache_loaded = True
-                car_data = cached_data['car']
-                if isinstance(car_data, tuple):
-                    print("LOG: Car data is tuple, unpacking")
-                    car, img_data = car_data
-                    img = Image.open(BytesIO(img_data))
-                else:
-                    print("LOG: Car data is dict, loading image")
-                    car = car_data
-                    img = Image.open(BytesIO(cached_data['img_data']))
-                if 'clue_variants' in cached_data:
-                    print("LOG: Loading clue_variants from cache")
-                    clue_variants = cached_data['clue_variants']
-                    clue_variants_loaded = True
-                else:
-                    print("LOG: No clue_variants in cache")
-                    clue_variants_loaded = False
-        except Exception as e1:
-            print(f"LOG: Error loading cache: {e1}")
-            # Corrupt cache - delete it
-            try:
-                os.remove(cache_file)
-            except Exception as e2:
-                print(f"LOG: Error deleting corrupt cache: {e2}")
-                pass
-            cached = None
-            cache_loaded = False
-            clue_variants_loaded = False
-
-    # If no current cache, pick a car and save
-    if not cache_loaded:
-        print("LOG: No current cache, picking a car")
-        car = chooseCar()
-        if car is not None:
-            print(f"LOG: Chose car: {car.get('Make')} {car.get('Model')}")
-            print("LOG: Fetching image")
-            response = requests.get(car["url"])
-            img_data = response.content
-            print("LOG: Image fetched, opening")
-            img = Image.open(BytesIO(img_data))
-            # Resize to max 800x600 to speed up processing
-            max_size = (800, 600)
-            print("LOG: Resizing image")
-            img.thumbnail(max_size, Image.Resampling.LANCZOS)
-            # Re-encode to bytes after resize
-            img_byte_arr = BytesIO()
-            img.save(img_byte_arr, format='PNG')
-            img_data = img_byte_arr.getvalue()
-            img = Image.open(BytesIO(img_data))
-            cache_loaded = True
-            try:
-                print("LOG: Computing greyscale")
-                # Compute clue_variants first
-                greyscale = img.convert("L")
-                width, height = greyscale.size
-                day_number = get_current_day_number()
-                print("LOG: Setting random seed")
-                random.seed(day_number + SEED)
-                print("LOG: Cropping clue")
-                clue = greyscale.crop((random.randint(0, int(width*0.4)), random.randint(0, int(height*0.4)), int(width*0.6), int(height*0.6)))
-                print("LOG: Creating clue variants")
-                clue_variants = create_clue_variants(img, clue, maxGuesses)
-                clue_variants_loaded = True
-                print("LOG: Saving cache")
-                save_car_cache(car, img_data, clue_variants)
-            except Exception as e:
-                print(f"LOG: Error computing/saving: {e}")
-                pass
-        else:
-            print("LOG: No car found")
+                cache_requests.inc(cache="current_day", result="hit")
+            if bundle is not None:
+                try:
+                    save_car_cache(bundle)
+                except OSError as e:
+                    logger.error("Error saving cache: %s", e)
 
-    # If cache loaded but clue_variants not, compute them
-    if cache_loaded and not clue_variants_loaded:
-        print("LOG: Cache loaded but no clue_variants, computing")
-        greyscale = img.convert("L")
-        width, height = greyscale.size
-        day_number = get_current_day_number()
-        random.seed(day_number + SEED)
-        clue = greyscale.crop((random.randint(0, int(width*0.4)), random.randint(0, int(height*0.4)), int(width*0.6), int(height*0.6)))
-        clue_variants = create_clue_variants(img, clue, maxGuesses)
-        clue_variants_loaded = True
-        # Resave cache with clue_variants
+        if bundle is None:
+            logger.error("ensure_car_cache_current() found no car")
+            return
+        guess_table(record_for(bundle.car))
+        activate_day(bundle)
+        day_state.mark_loaded(bundle.day_number)
+        logger.info("Serving day %s: %s %s", bundle.day_number, bundle.car['Make'], bundle.car['Model'])
+
+# How long before the reset the next day's car may be prepared
+PREPARE_AHEAD_SECONDS = int(os.environ.get("PREPARE_AHEAD_MINUTES", "360")) * 60
+# Set DAY_SCHEDULER=0 to disable the background worker
+DAY_SCHEDULER_ENABLED = os.environ.get("DAY_SCHEDULER", "1") != "0"
+
+def prepare_next_day():
+    """Build tomorrow's car ahead of the reset so no request has to"""
+    global pending_day
+    next_day = get_current_day_number() + 1
+    if pending_day is not None and pending_day.day_number == next_day:
+        return
+    if get_time_until_next_day() > PREPARE_AHEAD_SECONDS:
+        return
+    bundle = take_prepared_day(next_day) or generate_day(next_day)
+    if bundle is not None:
+        pending_day = bundle
+        logger.info("Day %s prepared ahead of reset", next_day)
+
+def run_day_scheduler(stop_event):
+    """Background loop: keep today's car loaded and tomorrow's prepared"""
+    import schedule
+    scheduler = schedule.Scheduler()
+    # Checking every second swaps the prepared day in right at the reset
+    scheduler.every(1).seconds.do(ensure_car_cache_current)
+    scheduler.every(1).minutes.do(prepare_next_day)
+    first_run = True
+    while not stop_event.is_set():
         try:
-            img_data = cached['img_data'] if cached else None
-            if img_data:
-                print("LOG: Resaving cache with clue_variants")
-                save_car_cache(car, img_data, clue_variants)
-        except Exception as e:
-            print(f"LOG: Error resaving cache: {e}")
-            pass
-    print("LOG: ensure_car_cache_current() completed")
+            if first_run:
+                scheduler.run_all()
+                first_run = False
+            else:
+                scheduler.run_pending()
+        except Exception:
+            logger.exception("Day scheduler error")
+        stop_event.wait(1)
 
 
-from fastapi import FastAPI
-from fastapi.responses import HTMLResponse, FileResponse, StreamingResponse
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import HTMLResponse, StreamingResponse, Response
+from precompressed import (IMAGE_MEDIA_TYPES, acceptable_image_formats, dumps_json, etag_matches, json_body,
+                           load_static)
+from car_search import CarSearch
 from io import BytesIO
-import math
+# Columns compared by /check-guess: (response key, catalog column, kind)
+COMPARED_FIELDS = [
+    ("year", "Year", "number"),
+    ("cylinders", "Cylinders", "cylinders"),
+    ("horsepower", "Horsepower", "number"),
+    ("fuel_capacity_gal", "Fuel capacity (gal)", "number"),
+    ("fuel_capacity_liters", "Fuel capacity (L)", "number"),
+    ("country", "Country", "string"),
+]
 
-def safe_value(val):
-    if isinstance(val, float) and math.isnan(val):
+def parse_compared_value(value, kind):
+    """Parse a catalog value for comparison; None means it can't be compared"""
+    if value is None:
+        return None
+    if kind == "string":
+        return str(value).lower()
+    try:
+        # Remove commas from strings before converting to float
+        text = str(value).replace(',', '')
+        if kind == "cylinders":
+            # Extract just the number from values like "V6", "4", "V8", etc.
+            match = re.search(r'\d+', text)
+            return float(match.group(0)) if match else float(text)
+        return float(text)
+    except (ValueError, TypeError):
         return None
-    return val
 
-app = FastAPI()
+class CarRecord:
+    """A catalog row with everything /check-guess needs parsed up front"""
+    __slots__ = ("doc", "name", "key", "make_key", "values", "parsed")
+
+    def __init__(self, doc):
+        self.doc = doc
+        self.name = f"{doc['Make']} {doc['Model']}"
+        self.key = normalize_car_name(self.name)
+        self.make_key = doc["Make"].lower()
+        self.values = tuple(doc[column] for _, column, _ in COMPARED_FIELDS)
+        self.parsed = tuple(parse_compared_value(value, kind) for value, (_, _, kind) in zip(self.values, COMPARED_FIELDS))
+
+def normalize_car_name(name):
+    return name.casefold()
+
+# "make model" (casefolded) -> CarRecord; the first row wins, like the old linear scan
+car_index = {}
+for doc in documents:
+    record = CarRecord(doc)
+    car_index.setdefault(record.key, record)
+
+def record_for(car_doc):
+    """The indexed record for a car dict, e.g. the current day's car"""
+    record = car_index.get(normalize_car_name(f"{car_doc['Make']} {car_doc['Model']}"))
+    return record if record is not None else CarRecord(car_doc)
+
+def compare_column(guessed_values, c_val, kind):
+    """Status of every guessed value in one column against the answer's value.
+
+    Unknown on either side is "unknown"; strings are "correct" or
+    "incorrect", numbers "correct", "lower" or "higher".
+    """
+    if c_val is None:
+        return ["unknown"] * len(guessed_values)
+    if kind == "string":
+        return ["unknown" if g_val is None else "correct" if g_val == c_val else "incorrect"
+                for g_val in guessed_values]
+    return ["unknown" if g_val is None else "correct" if g_val == c_val else "lower" if g_val < c_val else "higher"
+            for g_val in guessed_values]
+
+# The catalog column by column, in car_index order, for building GuessTables
+catalog_records = list(car_index.values())
+catalog_columns = list(zip(*(record.parsed for record in catalog_records)))
+
+class GuessTable:
+    """Every possible /check-guess response against one answer, serialized up front.
+
+    The statuses are computed a column at a time across the whole catalog,
+    so checking a guess is a dict lookup. Tables come from guess_table(),
+    which keeps the recent answers' ones around.
+    """
+
+    def __init__(self, correct):
+        statuses = [compare_column(column, c_val, kind)
+                    for column, c_val, (_, _, kind) in zip(catalog_columns, correct.parsed, COMPARED_FIELDS)]
+        correct_name = f"{correct.doc['Make']} {correct.doc['Model']}"
+        self.bodies = {}
+        for record, row in zip(catalog_records, zip(*statuses)):
+            is_correct = record.key == correct.key
+            self.bodies[record.key] = dumps_json({
+                "is_correct": is_correct,
+                "make": record.doc["Make"],
+                "make_correct": record.make_key == correct.make_key,
+                "comparisons": {key: {"status": status, "value": value}
+                                for (key, _, _), status, value in zip(COMPARED_FIELDS, row, record.values)},
+                "correct_name": correct_name if is_correct else None  # Only reveal name if guess is correct
+            })
+
+    def body(self, guessed_car_name):
+        """The response bytes for a guess, or None for an unknown car"""
+        return self.bodies.get(normalize_car_name(guessed_car_name.strip()))
+
+# GuessTables kept per worker, keyed by the answer's car key: today's plus
+# recently played history days
+GUESS_TABLES = int(os.environ.get("GUESS_TABLES", "32"))
+guess_tables = LRUCache(GUESS_TABLES)
+
+def guess_table(correct):
+    """The GuessTable for an answer (a CarRecord), built on first use"""
+    table = guess_tables.get(correct.key)
+    if table is None:
+        table = GuessTable(correct)
+        guess_tables.put(correct.key, table)
+    return table
+
+# Days activated from now on get their table before going live; the one
+# loaded from the cache at startup gets it here
+if car is not None:
+    guess_table(record_for(car))
+
+async def run_blocking(fn, *args, key=None):
+    """Run blocking work on the I/O pool, mapping overload to HTTP errors"""
+    try:
+        return await io_pool.run(fn, *args, key=key)
+    except PoolBusy:
+        raise HTTPException(status_code=503, detail="Server busy, try again shortly")
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Timed out")
+
+def cached_image_response(request: Request, body: bytes, etag: str, immutable=False, media_type="image/png",
+                          vary=None):
+    """Serve a pre-encoded image with ETag revalidation.
+
+    URLs keyed by the day the image belongs to (``?day=N``) never change, so
+    they are marked immutable. Unkeyed URLs must be revalidated because their
+    content rolls over at the daily reset. Pass ``vary="Accept"`` when the
+    format was negotiated.
+    """
+    if immutable:
+        cache_control = "public, max-age=31536000, immutable"
+    else:
+        cache_control = "no-cache"
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if vary:
+        headers["Vary"] = vary
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type=media_type, headers=headers)
+
+@asynccontextmanager
+async def lifespan(app):
+    stop_event = threading.Event()
+    if DAY_SCHEDULER_ENABLED:
+        threading.Thread(target=run_day_scheduler, args=(stop_event,), name="day-scheduler", daemon=True).start()
+    yield
+    stop_event.set()
+    io_pool.shutdown()
+    render_pool.shutdown()
+    stop_logging()
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(RequestIdMiddleware)
+app.add_middleware(metrics.MetricsMiddleware, requests_total=http_requests, request_seconds=http_seconds)
+
+# Static files are read once and served from memory, precompressed
+index_html = load_static(base("index.html"), "text/html; charset=utf-8")
+index_css = load_static(base("index.css"), "text/css; charset=utf-8")
+script_js = load_static(base("script.js"), "text/javascript; charset=utf-8")
+
+# The catalog never changes while running: serialize the car list and
+# every car's details once, and index the names for the typeahead
+selectable_names = [f"{doc['Make']} {doc['Model']}" for doc in selectable_documents]
+cars_json = json_body(selectable_names)
+car_search = CarSearch(selectable_names)
+
+def car_details(doc):
+    return {
+        "make": doc["Make"],
+        "model": doc["Model"],
+        "year": doc["Year"],
+        "cylinders": doc["Cylinders"],
+        "horsepower": doc["Horsepower"],
+        "fuel_capacity_gal": doc["Fuel capacity (gal)"],
+        "fuel_capacity_liters": doc["Fuel capacity (L)"],
+        "country": doc["Country"]
+    }
+
+car_details_json = {key: json_body(car_details(record.doc)) for key, record in car_index.items()}
+null_json = json_body(None)
+MAX_SEARCH_RESULTS = 50
 
 @app.get("/", response_class=HTMLResponse)
-async def get_index():
-    print("LOG: Received GET / request")
+async def get_index(request: Request):
     # Ensure cache is current for this request (deletes stale cache)
-    print("LOG: Calling ensure_car_cache_current()")
-    ensure_car_cache_current()
-    print("LOG: ensure_car_cache_current() completed")
-    print("LOG: Opening index.html")
-    with open(base("index.html"), "r", encoding="utf-8") as f:
-        content = f.read()
-    print("LOG: Read index.html content")
-    print("LOG: Returning HTML response")
-    return content
+    if day_state.is_current():
+        cache_requests.inc(cache="current_day", result="hit")
+    else:
+        await run_blocking(ensure_car_cache_current, key="today")
+    return index_html.respond(request)
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus scrape endpoint"""
+    return Response(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
 
 @app.get("/index.css")
-async def get_css():
-    return FileResponse(base("index.css"))
+async def get_css(request: Request):
+    return index_css.respond(request)
 
 @app.get("/script.js")
-async def get_script():
-    return FileResponse(base("script.js"))
+async def get_script(request: Request):
+    return script_js.respond(request)
 
 @app.get("/cars")
-async def get_cars():
-    cars = [f"{doc['Make']} {doc['Model']}" for doc in selectable_documents]
-    return cars
+async def get_cars(request: Request):
+    return cars_json.respond(request)
+
+@app.get("/cars/search")
+async def search_cars(q: str = "", limit: int = Query(10, ge=1, le=MAX_SEARCH_RESULTS)):
+    """Typeahead suggestions: prefix matches first, then substrings and near-misses"""
+    return car_search.search(q, limit)
+
+# (day number, cache_loaded) -> the /day-info JSON either side of seconds_until_next
+day_info_parts = (None, b"", b"")
 
 @app.get("/day-info")
 async def get_day_info():
-    return {
-        "day_number": get_current_day_number(),
-        "seconds_until_next": get_time_until_next_day(),
-        "cache_loaded": cache_loaded
-    }
+    global day_info_parts
+    key = (get_current_day_number(), cache_loaded)
+    if day_info_parts[0] != key:
+        head = dumps_json({"day_number": key[0]})[:-1] + b',"seconds_until_next":'
+        tail = b',"cache_loaded":' + dumps_json(key[1]) + b"}"
+        day_info_parts = (key, head, tail)
+    _, head, tail = day_info_parts
+    return Response(head + str(get_time_until_next_day()).encode() + tail, media_type="application/json")
 
 @app.get("/history-day/{day_number}")
 async def get_history_day(day_number: int):
     """Get the car for a specific historical day"""
-    print(f"LOG: Loading historical day {day_number}")
-    
-    # Use the same logic as chooseCar but for a specific day
-    random.seed(day_number + SEED)
-    shuffled = selectable_documents.copy()
-    random.shuffle(shuffled)
-    
-    for car in shuffled:
-        year = car.get("Year", "")
-        name = f'"{car["Make"]} {car["Model"]}" {year}'
-        from ddgs import DDGS
-        try:
-            with DDGS() as ddgs:
-                results = ddgs.images(name, max_results=1)
-                for result in results:
-                    r = result["image"]
-                    try:
-                        Image.open(BytesIO(requests.get(r).content))
-                    except:
-                        r = None
-                    if r:
-                        car["url"] = r
-                        # Return car info without modifying global state
-                        return {
-                            "day_number": day_number,
-                            "car_name": f"{car['Make']} {car['Model']}",
-                            "make": car["Make"],
-                            "model": car["Model"]
-                        }
-        except:
-            continue
-    
-    return {"error": "No car found for this day"}
+    logger.debug("Loading historical day %s", day_number)
+    bundle = await history_bundle(day_number)
+    if bundle is None:
+        return {"error": "No car found for this day"}
+    historical_car = bundle.car
+    return {
+        "day_number": day_number,
+        "car_name": f"{historical_car['Make']} {historical_car['Model']}",
+        "make": historical_car["Make"],
+        "model": historical_car["Model"]
+    }
+
+# Longest span of days one /history-days request may cover
+HISTORY_BATCH_MAX_DAYS = 366
+# Days per chunk written to a /history-days stream
+HISTORY_BATCH_CHUNK = 64
+
+@app.get("/history-days")
+async def get_history_days(first: int = Query(alias="from"), last: int = Query(None, alias="to")):
+    """Cars for a range of past days (inclusive) as NDJSON, one day per line.
+
+    Each day lists the car /history-day and /history-clue.png show for it:
+    the car in its archived manifest, which is a later candidate when the
+    first had no usable image. Days not built yet fall back to the day
+    schedule's first candidate, the car building them tries first, so no
+    day is built or searched for. Only days before today are listed; ``to``
+    defaults to yesterday.
+    """
+    yesterday = get_current_day_number() - 1
+    first = max(first, FIRST_DAY)
+    last = yesterday if last is None else min(last, yesterday)
+    if last - first + 1 > HISTORY_BATCH_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"At most {HISTORY_BATCH_MAX_DAYS} days per request")
+
+    archived = set(await run_blocking(history_archive.days))
+    built = [day for day in archived if first <= day <= last and day not in archived_cars]
+    if built:
+        await run_blocking(lambda: [archived_car(day) for day in built])
+
+    async def lines():
+        chunk = []
+        for day, scheduled in day_schedule.cars_for_days(first, last):
+            listed = archived_cars.get(day, scheduled) if day in archived else scheduled
+            chunk.append(json.dumps({
+                "day_number": day,
+                "car_name": f"{listed['Make']} {listed['Model']}",
+                "make": listed["Make"],
+                "model": listed["Model"],
+            }, separators=(",", ":")) + "\n")
+            if len(chunk) == HISTORY_BATCH_CHUNK:
+                yield "".join(chunk)
+                chunk = []
+        if chunk:
+            yield "".join(chunk)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 @app.get("/car/{car_name}")
-async def get_car_details(car_name: str):
-    # Find the car in documents
-    for doc in documents:
-        full_name = f"{doc['Make']} {doc['Model']}"
-        if full_name.lower() == car_name.lower():
-            return {
-                "make": doc["Make"],
-                "model": doc["Model"],
-                "year": safe_value(doc["Year"]),
-                "cylinders": safe_value(doc["Cylinders"]),
-                "horsepower": safe_value(doc["Horsepower"]),
-                "fuel_capacity_gal": safe_value(doc["Fuel capacity (gal)"]),
-                "fuel_capacity_liters": safe_value(doc["Fuel capacity (L)"]),
-                "country": safe_value(doc["Country"])
-            }
-    return None
+async def get_car_details(request: Request, car_name: str):
+    body = car_details_json.get(normalize_car_name(car_name), null_json)
+    return body.respond(request)
 
 def get_car_for_day(day_number: int):
     """Get the correct car for a specific day number"""
-    random.seed(day_number + SEED)
-    shuffled = selectable_documents.copy()
-    random.shuffle(shuffled)
-    
-    # Return the first car (matching the logic in chooseCar)
-    return shuffled[0] if shuffled else None
+    # The first candidate (matching the logic in chooseCar)
+    return day_schedule.car_for_day(day_number)
+
+def get_history_car(day_number):
+    """The answer for a past day a client asked about; None for today, the future or junk"""
+    return get_car_for_day(day_number) if is_past_day(day_number) else None
+
+async def history_bundle(day):
+    """A past day's DayBundle, from day_cache or built through the archive; None outside the history"""
+    if not is_past_day(day):
+        return None
+    return day_cache.get(day) or await run_blocking(load_history_bundle, day, key=("history", day))
+
+async def guess_table_for(correct_car):
+    """The GuessTable for a day's car; one not built yet is built off the event loop"""
+    correct = record_for(correct_car)
+    return guess_tables.get(correct.key) or await run_blocking(
+        guess_table, correct, key=("guess_table", correct.key))
+
+def guess_body(table, guessed_car_name):
+    """The serialized /check-guess response for one guess"""
+    body = table.body(guessed_car_name)
+    return body if body is not None else dumps_json({"error": "Car not found"})
 
 @app.post("/check-guess")
 async def check_guess(guess: dict):
-    guessed_car_name = guess.get("car_name", "").strip()
+    guessed_car_name = guess.get("car_name", "")
     history_day = guess.get("day_number", None)  # Optional historical day parameter
     
-    # Find the guessed car in documents
-    guessed_car = None
-    for doc in documents:
-        full_name = f"{doc['Make']} {doc['Model']}"
-        if full_name.lower() == guessed_car_name.lower():
-            guessed_car = doc
-            break
-    
-    if not guessed_car:
+    if car_index.get(normalize_car_name(guessed_car_name.strip())) is None:
         return {"error": "Car not found"}
     
     # Get the correct car (either current day or historical)
     if history_day is not None:
-        correct_car = get_car_for_day(history_day)
+        correct_car = get_history_car(history_day)
         if not correct_car:
             return {"error": "Could not determine correct car for that day"}
     else:
         correct_car = car
+    table = await guess_table_for(correct_car)
+    return Response(guess_body(table, guessed_car_name), media_type="application/json")
+
+@app.post("/check-guesses")
+async def check_guesses(request: dict):
+    """Check a whole guess sequence at once, e.g. to replay a saved game.
+
+    Takes ``{"car_names": [...], "day_number": optional}`` and returns
+    ``{"results": [...]}`` with one /check-guess response per guess, in order.
+    """
+    car_names = request.get("car_names")
+    history_day = request.get("day_number", None)
+    if not isinstance(car_names, list) or not all(isinstance(name, str) for name in car_names):
+        return {"error": "car_names must be a list of car names"}
+    if len(car_names) > maxGuesses:
+        return {"error": f"At most {maxGuesses} guesses"}
     
-    # Compare with correct car and return comparison results
-    correct_name = f"{correct_car['Make']} {correct_car['Model']}"
-    is_correct = guessed_car_name.lower() == correct_name.lower()
-    
-    def compare_value(guessed, correct, value_type):
-        if guessed is None or correct is None:
-            return {"status": "unknown", "value": guessed}
-        
-        if value_type == "string":
-            return {
-                "status": "correct" if str(guessed).lower() == str(correct).lower() else "incorrect",
-                "value": guessed
-            }
-        else:  # numeric comparison
-            try:
-                # Remove commas from strings before converting to float
-                g_str = str(guessed).replace(',', '')
-                c_str = str(correct).replace(',', '')
-                
-                # For cylinders, extract numeric value after first character if needed
-                if value_type == "cylinders":
-                    # Extract just the number from values like "V6", "4", "V8", etc.
-                    g_match = re.search(r'\d+', g_str)
-                    c_match = re.search(r'\d+', c_str)
-                    g_val = float(g_match.group(0)) if g_match else float(g_str)
-                    c_val = float(c_match.group(0)) if c_match else float(c_str)
-                else:
-                    g_val = float(g_str)
-                    c_val = float(c_str)
-                
-                if g_val == c_val:
-                    status = "correct"
-                elif g_val < c_val:
-                    status = "lower"
-                else:
-                    status = "higher"
-                return {"status": status, "value": guessed}
-            except (ValueError, TypeError):
-                return {"status": "unknown", "value": guessed}
-    
-    return {
-        "is_correct": is_correct,
-        "make": guessed_car["Make"],
-        "make_correct": guessed_car["Make"].lower() == correct_car["Make"].lower(),
-        "comparisons": {
-            "year": compare_value(safe_value(guessed_car["Year"]), safe_value(correct_car["Year"]), "number"),
-            "cylinders": compare_value(safe_value(guessed_car["Cylinders"]), safe_value(correct_car["Cylinders"]), "cylinders"),
-            "horsepower": compare_value(safe_value(guessed_car["Horsepower"]), safe_value(correct_car["Horsepower"]), "number"),
-            "fuel_capacity_gal": compare_value(safe_value(guessed_car["Fuel capacity (gal)"]), safe_value(correct_car["Fuel capacity (gal)"]), "number"),
-            "fuel_capacity_liters": compare_value(safe_value(guessed_car["Fuel capacity (L)"]), safe_value(correct_car["Fuel capacity (L)"]), "number"),
-            "country": compare_value(safe_value(guessed_car["Country"]), safe_value(correct_car["Country"]), "string")
-        },
-        "correct_name": correct_name if is_correct else None  # Only reveal name if guess is correct
-    }
+    if history_day is not None:
+        correct_car = get_history_car(history_day)
+        if not correct_car:
+            return {"error": "Could not determine correct car for that day"}
+    else:
+        correct_car = car
+    table = await guess_table_for(correct_car)
+    results = b",".join(guess_body(table, name) for name in car_names)
+    return Response(b'{"results":[' + results + b"]}", media_type="application/json")
 
 @app.post("/reveal-hint")
 async def reveal_hint(request: dict):
@@ -597,18 +1002,18 @@ async def reveal_hint(request: dict):
     
     # Get the correct car
     if history_day is not None:
-        correct_car = get_car_for_day(history_day)
+        correct_car = get_history_car(history_day)
         if not correct_car:
             return {"error": "Could not determine correct car for that day"}
     else:
         correct_car = car
     
     column_map = {
-        "year": safe_value(correct_car["Year"]),
-        "cylinders": safe_value(correct_car["Cylinders"]),
-        "hp": safe_value(correct_car["Horsepower"]),
-        "fuel": f"{safe_value(correct_car['Fuel capacity (gal)'])} / {safe_value(correct_car['Fuel capacity (L)'])}",
-        "country": safe_value(correct_car["Country"])
+        "year": correct_car["Year"],
+        "cylinders": correct_car["Cylinders"],
+        "hp": correct_car["Horsepower"],
+        "fuel": f"{correct_car['Fuel capacity (gal)']} / {correct_car['Fuel capacity (L)']}",
+        "country": correct_car["Country"]
     }
     
     if column_name not in column_map:
@@ -619,72 +1024,48 @@ async def reveal_hint(request: dict):
         "value": column_map[column_name]
     }
 
+@functools.lru_cache(maxsize=64)
+def reveal_answer_json(name):
+    """The /reveal-answer body for a car, built once per day rather than per game over"""
+    return json_body({"name": name})
+
 @app.post("/reveal-answer")
-async def reveal_answer(request: dict = None):
+async def reveal_answer(request: Request, payload: dict = None):
     """Reveal the correct car name (for game over)"""
-    history_day = request.get("day_number", None) if request else None
+    history_day = payload.get("day_number", None) if payload else None
     
     # Get the correct car
     if history_day is not None:
-        correct_car = get_car_for_day(history_day)
+        correct_car = get_history_car(history_day)
         if not correct_car:
             return {"error": "Could not determine correct car for that day"}
     else:
         correct_car = car
     
-    return {
-        "name": f"{correct_car['Make']} {correct_car['Model']}"
-    }
+    return reveal_answer_json(f"{correct_car['Make']} {correct_car['Model']}").respond(request)
 
 @app.get("/clue.png")
-async def get_clue(guess: int = 0):
-    """Get clue image for a specific guess number (0-indexed)"""
+async def get_clue(request: Request, guess: int = 0, day: int = None, w: int = None):
+    """Get clue image for a specific guess number (0-indexed).
+
+    Despite the name, the format follows the Accept header and ``w`` asks
+    for a smaller rendition; plain requests get the full-size PNG.
+    """
+    current = today
     # Clamp guess to valid range
-    guess = max(0, min(guess, len(clue_variants) - 1))
-    
-    img_byte_arr = BytesIO()
-    clue_variants[guess].save(img_byte_arr, format='PNG')
-    img_byte_arr.seek(0)
-    return StreamingResponse(img_byte_arr, media_type="image/png")
+    guess = max(0, min(guess, len(current.clue_pngs) - 1))
+    formats = acceptable_image_formats(request.headers.get("accept"))
+    digest, fmt = select_clue(current.clue_digests, current.renditions, guess, formats, w)
+    return cached_image_response(request, current.blobs[digest], etag_for_digest(digest),
+                                 day == current.day_number, IMAGE_MEDIA_TYPES[fmt], vary="Accept")
 
 @app.get("/history-clue.png")
-async def get_history_clue(day: int, guess: int = 0):
+async def get_history_clue(request: Request, day: int, guess: int = 0, w: int = None):
     """Get clue image for a specific historical day and guess number"""
-    print(f"LOG: Loading history clue for day {day}, guess {guess}")
-    
-    # Get the car for this historical day
-    random.seed(day + SEED)
-    shuffled = selectable_documents.copy()
-    random.shuffle(shuffled)
-    
-    historical_car = None
-    historical_img = None
-    
-    for car in shuffled:
-        year = car.get("Year", "")
-        name = f'"{car["Make"]} {car["Model"]}" {year}'
-        from ddgs import DDGS
-        try:
-            with DDGS() as ddgs:
-                results = ddgs.images(name, max_results=1)
-                for result in results:
-                    r = result["image"]
-                    try:
-                        img_response = requests.get(r)
-                        historical_img = Image.open(BytesIO(img_response.content))
-                        # Resize to max 800x600 to match current day logic
-                        max_size = (800, 600)
-                        historical_img.thumbnail(max_size, Image.Resampling.LANCZOS)
-                        historical_car = car
-                        break
-                    except:
-                        continue
-                if historical_car:
-                    break
-        except:
-            continue
+    logger.debug("Loading history clue for day %s, guess %s", day, guess)
+    bundle = await history_bundle(day)
     
-    if not historical_img:
+    if bundle is None:
         # Return a blank/error image if no car found
         blank_img = Image.new('RGB', (400, 300), color='gray')
         img_byte_arr = BytesIO()
@@ -692,34 +1073,62 @@ async def get_history_clue(day: int, guess: int = 0):
         img_byte_arr.seek(0)
         return StreamingResponse(img_byte_arr, media_type="image/png")
     
-    # Create clue variants for this historical image
-    greyscale_hist = historical_img.convert("L")
-    width_hist, height_hist = greyscale_hist.size
-    random.seed(day + SEED)
-    clue_hist = greyscale_hist.crop((
-        random.randint(0, int(width_hist*0.4)),
-        random.randint(0, int(height_hist*0.4)),
-        int(width_hist*0.6),
-        int(height_hist*0.6)
-    ))
-    
-    historical_clue_variants = create_clue_variants(historical_img, clue_hist, maxGuesses)
-    
     # Clamp guess to valid range
-    guess = max(0, min(guess, len(historical_clue_variants) - 1))
-    
-    img_byte_arr = BytesIO()
-    historical_clue_variants[guess].save(img_byte_arr, format='PNG')
-    img_byte_arr.seek(0)
-    return StreamingResponse(img_byte_arr, media_type="image/png")
+    guess = max(0, min(guess, len(bundle.clue_pngs) - 1))
+    formats = acceptable_image_formats(request.headers.get("accept"))
+    digest, fmt = select_clue(bundle.clue_digests, bundle.renditions, guess, formats, w)
+    return cached_image_response(request, bundle.blobs[digest], etag_for_digest(digest), immutable=True,
+                                 media_type=IMAGE_MEDIA_TYPES[fmt], vary="Accept")
 
 @app.get("/full-image.png")
-async def get_full_image():
-    img_byte_arr = BytesIO()
-    img.save(img_byte_arr, format='PNG')
-    img_byte_arr.seek(0)
-    return StreamingResponse(img_byte_arr, media_type="image/png")
+async def get_full_image(request: Request, day: int = None):
+    current = today
+    return cached_image_response(request, current.full_image_png, current.full_image_etag, day == current.day_number)
+
+def warm_history(first_day, last_day):
+    """Fill the history archive for a range of days (inclusive)"""
+    for day in range(first_day, last_day + 1):
+        if history_archive.get(day) is not None:
+            print(f"Day {day}: already archived")
+            continue
+        manifest = get_history_entry(day)
+        if manifest is None:
+            print(f"Day {day}: no car found")
+        else:
+            print(f"Day {day}: {manifest['car']['Make']} {manifest['car']['Model']}")
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="Supercardle server")
+    subparsers = parser.add_subparsers(dest="command")
+    serve_parser = subparsers.add_parser("serve", help="Run the web server (default)")
+    serve_parser.add_argument("--host", default="0.0.0.0")
+    serve_parser.add_argument("--port", type=int, default=8000)
+    serve_parser.add_argument("--workers", type=int, default=int(os.environ.get("WORKERS", "1")),
+                              help="Worker processes; they share the on-disk day state")
+    warm_parser = subparsers.add_parser("warm-history", help="Pre-build archived history days")
+    warm_parser.add_argument("first_day", type=int)
+    warm_parser.add_argument("last_day", type=int)
+    library_parser = subparsers.add_parser("build-image-library", help="Fetch and store an image for every car")
+    library_parser.add_argument("--workers", type=int, default=4)
+    library_parser.add_argument("--force", action="store_true", help="Re-fetch cars already in the library")
+    args = parser.parse_args()
+
+    if args.command == "warm-history":
+        warm_history(args.first_day, args.last_day)
+    elif args.command == "build-image-library":
+        failed = build_library(documents, image_fetcher, image_library, workers=args.workers, force=args.force)
+        print(f"Image library: {len(image_library.entries)} cars, {len(failed)} without an image")
+    else:
+        import uvicorn
+        host = getattr(args, "host", "0.0.0.0")
+        port = getattr(args, "port", 8000)
+        workers = getattr(args, "workers", int(os.environ.get("WORKERS", "1")))
+        # log_config=None leaves uvicorn's records to the queue-backed root logger
+        options = dict(host=host, port=port, log_config=None, access_log=not PRODUCTION)
+        if workers > 1:
+            # Each worker imports main on its own; the day state, the history
+            # archive and the mmapped images are shared through the disk
+            uvicorn.run("main:app", workers=workers, app_dir=basepath, **options)
+        else:
+            uvicorn.run(app, **options)
\ No newline at end of file
@@ -0,0 +1,119 @@
+import gzip
+import hashlib
+import json
+
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; fall back to gzip only
+    brotli = None
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the stdlib encoder gives the same bytes, slower
+    orjson = None
+
+# Bodies smaller than this gain nothing from compression, so only the
+# identity response is built for them
+MIN_COMPRESS_BYTES = 256
+
+
+# Clue image formats, most preferred first, and their media types
+IMAGE_MEDIA_TYPES = {
+    "avif": "image/avif",
+    "webp": "image/webp",
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+}
+
+
+def _accepted_tokens(header):
+    """Lower-cased names listed in an Accept-style header, minus ones refused with q=0"""
+    accepted = set()
+    if not header:
+        return accepted
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        params = params.replace(" ", "")
+        if params in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+def accepted_encodings(accept_encoding):
+    """Content codings a client accepts, ignoring ones it refuses with q=0"""
+    return _accepted_tokens(accept_encoding)
+
+
+def acceptable_image_formats(accept):
+    """Image formats a client names in its Accept header, most preferred first.
+
+    Wildcards don't count, since browsers send image/* without supporting
+    every format; PNG is always acceptable and comes last.
+    """
+    media_types = _accepted_tokens(accept)
+    return [fmt for fmt, media_type in IMAGE_MEDIA_TYPES.items()
+            if fmt == "png" or media_type in media_types]
+
+
+def etag_matches(if_none_match, etag):
+    """Check an If-None-Match header value against an ETag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return etag in candidates or f"W/{etag}" in candidates
+
+
+class PrecompressedBody:
+    """An immutable response body encoded once, served many times.
+
+    The identity, gzip and (when the brotli package is installed) brotli
+    responses are all built up front (only identity for tiny bodies), along
+    with the 304 for revalidation, so serving one is a header lookup rather
+    than any encoding work.
+    """
+
+    def __init__(self, body: bytes, media_type, cache_control="no-cache"):
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        headers = {"ETag": self.etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+        self.identity = Response(body, media_type=media_type, headers=headers)
+        self.gzip = self.brotli = None
+        if len(body) >= MIN_COMPRESS_BYTES:
+            self.gzip = Response(gzip.compress(body, 9), media_type=media_type,
+                                 headers={**headers, "Content-Encoding": "gzip"})
+        if brotli is not None and self.gzip is not None:
+            self.brotli = Response(brotli.compress(body), media_type=media_type,
+                                   headers={**headers, "Content-Encoding": "br"})
+        self.not_modified = Response(status_code=304, headers=headers)
+
+    def respond(self, request):
+        if etag_matches(request.headers.get("if-none-match"), self.etag):
+            return self.not_modified
+        encodings = accepted_encodings(request.headers.get("accept-encoding"))
+        if self.brotli is not None and "br" in encodings:
+            return self.brotli
+        if self.gzip is not None and "gzip" in encodings:
+            return self.gzip
+        return self.identity
+
+
+def dumps_json(content):
+    """Compact UTF-8 JSON, as FastAPI's JSONResponse would send it"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def json_body(content, cache_control="no-cache"):
+    """Serialize an immutable JSON payload once, with its compressed forms"""
+    return PrecompressedBody(dumps_json(content), "application/json", cache_control)
+
+
+def load_static(path, media_type):
+    """Read a static file once and precompress it"""
+    with open(path, "rb") as f:
+        return PrecompressedBody(f.read(), media_type)
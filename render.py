@@ -0,0 +1,205 @@
+import logging
+import time
+from io import BytesIO
+
+from PIL import Image, features
+
+logger = logging.getLogger(__name__)
+
+# Width of the low-res clue previews served for small ?w= requests
+PREVIEW_WIDTH = 160
+
+# Save options per clue encoding. PNG stays the lossless default for
+# clients that accept nothing better; the others are far smaller for photos.
+ENCODE_OPTIONS = {
+    "png": {"format": "PNG"},
+    "avif": {"format": "AVIF", "quality": 60, "speed": 8},
+    "webp": {"format": "WEBP", "quality": 80, "method": 4},
+    "jpeg": {"format": "JPEG", "quality": 82, "progressive": True, "optimize": True},
+}
+
+def supported_formats():
+    """Clue encodings this Pillow build can write (AVIF support is optional)"""
+    formats = ["webp", "jpeg", "png"]
+    try:
+        if features.check("avif"):
+            formats.insert(0, "avif")
+    except ValueError:  # Pillow too old to know about AVIF
+        pass
+    return formats
+
+class ClueRenderer:
+    """Renders the clue variants of one source image in stages.
+
+    Shared stages run once: the centre crop every variant zooms into, and
+    its desaturated copy. A variant is then a crop of those, a blend at crop
+    size and a single resize back up, so the grayscale conversion no longer
+    runs on every full-size variant. Variants are rendered one at a time;
+    asking for guess 0 only renders guess 0.
+
+    Desaturating before resampling rather than after moves some pixels by
+    up to two levels from the reference loop; bench_clue_variants checks
+    that tolerance and pins the exact output with golden digests.
+
+    Sources with alpha are resampled as RGBA, like the reference, and
+    desaturated after the resize: Pillow premultiplies alpha when it
+    resamples, so graying first would drift several levels at soft edges.
+    They skip the shared gray base and come out exactly as before.
+
+    Palette sources are converted up front: Pillow can only resize "P"
+    images with nearest neighbour, so the original loop gave them blocky
+    zooms; here they get LANCZOS like everything else.
+
+    With ``low_memory`` the grayscale base isn't kept and each variant
+    desaturates its own crop instead, so only the colour base stays alive
+    between variants.
+    """
+
+    def __init__(self, original_img, num_guesses=7, low_memory=False):
+        self.num_guesses = num_guesses
+        self.low_memory = low_memory
+        # Crop the original image to start at 50% visible area
+        orig_width, orig_height = original_img.size
+        logger.debug("Rendering %d clue variants from a %dx%d image", num_guesses, orig_width, orig_height)
+        crop_width_orig = int(orig_width * 0.5)
+        crop_height_orig = int(orig_height * 0.5)
+        left_orig = (orig_width - crop_width_orig) // 2
+        top_orig = (orig_height - crop_height_orig) // 2
+        has_alpha = original_img.mode in ("RGBA", "LA", "PA") or "transparency" in original_img.info
+        self.base = original_img.crop(
+            (left_orig, top_orig, left_orig + crop_width_orig, top_orig + crop_height_orig)
+        ).convert("RGBA" if has_alpha else "RGB")
+        self._gray = None
+
+    def _gray_crop(self, box):
+        if self.low_memory:
+            return self.base.crop(box).convert("L")
+        if self._gray is None:
+            self._gray = self.base.convert("L")
+        return self._gray.crop(box)
+
+    def variant(self, guess_num):
+        """Render one variant (0-indexed guess)"""
+        # Crop size factor from 0.5 (zoomed in) to 1.0 (the whole base), and
+        # colour from grayscale (guess 0) to full colour (last guess)
+        crop_factor = 0.5 + (guess_num / (self.num_guesses - 1)) * 0.5
+        color_intensity = guess_num / (self.num_guesses - 1)
+
+        # Center the crop
+        size = self.base.size
+        crop_width = int(size[0] * crop_factor)
+        crop_height = int(size[1] * crop_factor)
+        left = (size[0] - crop_width) // 2
+        top = (size[1] - crop_height) // 2
+        box = (left, top, left + crop_width, top + crop_height)
+
+        # Blending and resampling are both linear, so blend the (smaller)
+        # crop and scale the result back to the base size for display
+        if self.base.mode == "RGBA":
+            variant = self.base.crop(box).resize(size, Image.Resampling.LANCZOS).convert("RGB")
+            if color_intensity < 1:
+                gray = variant.convert("L").convert("RGB")
+                variant = gray if color_intensity == 0 else Image.blend(gray, variant, color_intensity)
+        elif color_intensity == 0:
+            # Fully gray: resample one channel instead of three
+            variant = self._gray_crop(box).resize(size, Image.Resampling.LANCZOS).convert("RGB")
+        elif color_intensity == 1:
+            variant = self.base.crop(box).resize(size, Image.Resampling.LANCZOS)
+        else:
+            gray = self._gray_crop(box).convert("RGB")
+            variant = Image.blend(gray, self.base.crop(box), color_intensity).resize(size, Image.Resampling.LANCZOS)
+        logger.debug("Variant %d: crop %.2f, color %.2f", guess_num, crop_factor, color_intensity)
+        return variant
+
+    def variants(self):
+        """Every variant in guess order, rendered as it is consumed"""
+        for guess_num in range(self.num_guesses):
+            yield self.variant(guess_num)
+
+# Generate clue variants with progressive zoom and color
+def create_clue_variants(original_img, num_guesses=7):
+    """Create progressive clue variants with zoom out and color reveal"""
+    return list(ClueRenderer(original_img, num_guesses).variants())
+
+def encode_png(image) -> bytes:
+    """Encode a PIL image to PNG bytes"""
+    img_byte_arr = BytesIO()
+    image.save(img_byte_arr, format='PNG')
+    return img_byte_arr.getvalue()
+
+def encode_image(image, fmt) -> bytes:
+    """Encode a PIL image in one of the ENCODE_OPTIONS formats"""
+    if fmt == "png":
+        return encode_png(image)
+    img_byte_arr = BytesIO()
+    image.save(img_byte_arr, **ENCODE_OPTIONS[fmt])
+    return img_byte_arr.getvalue()
+
+def encode_variant(variant, formats, png=None):
+    """Encode one clue variant at full size and as a preview, in every format.
+
+    Returns ``[(width, {fmt: bytes})]``, widest first. A full-size PNG
+    already encoded can be passed in as ``png``.
+    """
+    preview = variant.copy()
+    preview.thumbnail((PREVIEW_WIDTH, PREVIEW_WIDTH * 4), Image.Resampling.LANCZOS)
+    full = {fmt: png if fmt == "png" and png is not None else encode_image(variant, fmt) for fmt in formats}
+    small = {fmt: encode_image(preview, fmt) for fmt in formats}
+    return [(variant.width, full), (preview.width, small)]
+
+def collect_renditions(encoded_variants):
+    """encode_variant results, one per variant, as
+    ``[{"width": w, "formats": {fmt: [bytes per variant]}}]``"""
+    renditions = []
+    for sizes in zip(*encoded_variants):
+        width, formats = sizes[0]
+        renditions.append({"width": width, "formats": {fmt: [encoded[fmt] for _, encoded in sizes] for fmt in formats}})
+    return renditions
+
+def load_source_image(img_data):
+    """Decode a downloaded image, shrink it to at most 800x600 and re-encode it as PNG"""
+    img = Image.open(BytesIO(img_data))
+    # Resize to max 800x600 to speed up processing
+    img.thumbnail((800, 600), Image.Resampling.LANCZOS)
+    return img, encode_png(img)
+
+def render_day_images(img_data, num_guesses=7, formats=("png",), low_memory=False):
+    """Downloaded image bytes -> (source PNG, clue PNGs, renditions, timings).
+
+    Renditions are the clues in ``formats`` (see collect_renditions), and
+    timings are {stage: seconds} for decode, render and encode. Takes and
+    returns plain bytes so it can run in a worker process.
+
+    Each variant is encoded as soon as it is rendered, so only one decoded
+    variant is alive at a time; ``low_memory`` is passed to ClueRenderer.
+
+    The timings are returned rather than recorded, since this usually runs
+    in a render worker process whose metrics nobody scrapes.
+    """
+    timings = dict.fromkeys(("image_decode", "render_variants", "png_encode", "rendition_encode"), 0.0)
+    start = time.perf_counter()
+    img = Image.open(BytesIO(img_data))
+    img.thumbnail((800, 600), Image.Resampling.LANCZOS)
+    timings["image_decode"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    source_png = encode_png(img)
+    timings["png_encode"] += time.perf_counter() - start
+
+    renderer = ClueRenderer(img, num_guesses, low_memory)
+    del img
+    clue_pngs = []
+    encoded_variants = []
+    for guess_num in range(num_guesses):
+        start = time.perf_counter()
+        variant = renderer.variant(guess_num)
+        timings["render_variants"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        clue_pngs.append(encode_png(variant))
+        timings["png_encode"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        encoded_variants.append(encode_variant(variant, formats, clue_pngs[-1]))
+        timings["rendition_encode"] += time.perf_counter() - start
+    return source_png, clue_pngs, collect_renditions(encoded_variants), timings
@@ -208,7 +208,28 @@ async function restoreGameState(saved) {
     hintsAvailable = saved.hintsAvailable;
     correctColumns = new Set(saved.correctColumns);
     gameState = saved;
-    
+
+    // Older saved games may lack results; check the whole sequence in one request
+    if (saved.guesses.some(guess => !guess.result)) {
+        const requestBody = { car_names: saved.guesses.map(guess => guess.carName) };
+        if (isHistoryMode && historyDayNumber) {
+            requestBody.day_number = historyDayNumber;
+        }
+        const response = await fetch('check-guesses', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify(requestBody)
+        });
+        const data = await response.json();
+        if (data.results) {
+            saved.guesses.forEach((guess, i) => {
+                guess.result = guess.result || data.results[i];
+            });
+        }
+    }
+
     // Replay all previous guesses WITHOUT animations
     for (let i = 0; i < saved.guesses.length; i++) {
         await displayCarStats(saved.guesses[i].carName, i, true, saved.guesses[i].result);
@@ -272,9 +293,9 @@ async function displayCarStats(carName, rowIndex, skipAnimations = false, result
     // Update clue image to show more as we make more guesses
     const clueImg = document.getElementById('clue');
     if (isHistoryMode && historyDayNumber) {
-        clueImg.src = `history-clue.png?day=${historyDayNumber}&guess=${rowIndex}&t=${Date.now()}`;
+        clueImg.src = `history-clue.png?day=${historyDayNumber}&guess=${rowIndex}`;
     } else {
-        clueImg.src = `clue.png?guess=${rowIndex}&t=${Date.now()}`;
+        clueImg.src = actualCurrentDay ? `clue.png?day=${actualCurrentDay}&guess=${rowIndex}` : `clue.png?guess=${rowIndex}`;
     }
     
     let result = resultData;
@@ -512,25 +533,11 @@ async function displayCarStats(carName, rowIndex, skipAnimations = false, result
     return result.is_correct;
 }
 
-input.addEventListener('input', function() {
-    const value = this.value.toLowerCase();
+function showSuggestions(cars) {
     suggestionsDiv.innerHTML = '';
-    
-    // Update button state
-    enterBtn.disabled = !isValidCar(value);
-    
-    if (value.length === 0) {
-        suggestionsDiv.classList.remove('active');
-        return;
-    }
-    
-    const filtered = carList.filter(car => 
-        car.toLowerCase().includes(value)
-    ).slice(0, 10);
-    
-    if (filtered.length > 0) {
+    if (cars.length > 0) {
         suggestionsDiv.classList.add('active');
-        filtered.forEach(car => {
+        cars.forEach(car => {
             const div = document.createElement('div');
             div.className = 'suggestion-item';
             div.textContent = car;
@@ -544,6 +551,41 @@ input.addEventListener('input', function() {
     } else {
         suggestionsDiv.classList.remove('active');
     }
+}
+
+// Suggestions come from the server's typeahead (which also matches
+// "mercedes benz" and typos); only the latest query's answer is shown
+let suggestionRequest = 0;
+let suggestionTimer = null;
+
+input.addEventListener('input', function() {
+    const value = this.value.toLowerCase();
+    
+    // Update button state
+    enterBtn.disabled = !isValidCar(value);
+    
+    clearTimeout(suggestionTimer);
+    const request = ++suggestionRequest;
+    if (value.length === 0) {
+        suggestionsDiv.innerHTML = '';
+        suggestionsDiv.classList.remove('active');
+        return;
+    }
+    
+    suggestionTimer = setTimeout(async () => {
+        let cars;
+        try {
+            const response = await fetch(`cars/search?q=${encodeURIComponent(value)}&limit=10`);
+            if (!response.ok) throw new Error(`search failed: ${response.status}`);
+            cars = await response.json();
+        } catch (e) {
+            // Fall back to filtering the local list
+            cars = carList.filter(car => car.toLowerCase().includes(value)).slice(0, 10);
+        }
+        if (request === suggestionRequest) {
+            showSuggestions(cars);
+        }
+    }, 80);
 });
 
 // Close suggestions when clicking outside
@@ -815,7 +857,7 @@ function showGameOverModal(won) {
     
     // Load the full image only when modal is shown
     if (!fullCarImage.src) {
-        fullCarImage.src = 'full-image.png';
+        fullCarImage.src = actualCurrentDay ? `full-image.png?day=${actualCurrentDay}` : 'full-image.png';
     }
     
     if (won) {
@@ -1034,7 +1076,7 @@ async function loadHistoricalDay(dayNumber) {
     
     // Load the initial clue image for this historical day
     if (clueImg) {
-        clueImg.src = `history-clue.png?day=${dayNumber}&guess=0&t=${Date.now()}`;
+        clueImg.src = `history-clue.png?day=${dayNumber}&guess=0`;
         // Restore opacity when image loads
         clueImg.onload = () => {
             clueImg.style.opacity = '1';
@@ -0,0 +1,93 @@
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+class PoolBusy(Exception):
+    """Raised when a pool already has as much work queued as it allows"""
+
+
+class WorkerPool:
+    """Bounded pool for blocking work called from async handlers.
+
+    At most ``workers`` calls run at once and at most ``max_queue`` more may
+    wait for a slot; past that, calls fail fast with PoolBusy instead of
+    piling up. Every call is given ``timeout`` seconds. Async callers can
+    pass a ``key`` so that concurrent calls for the same work share one run.
+    """
+
+    def __init__(self, name, workers, max_queue, timeout, processes=False, initializer=None):
+        self.name = name
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.processes = processes
+        self.initializer = initializer
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._inflight = {}
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                if self.processes:
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=self.initializer)
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=self.name)
+            return self._executor
+
+    @property
+    def pending(self):
+        """Calls running or waiting for a slot"""
+        return self._pending
+
+    def _release(self, _future):
+        with self._lock:
+            self._pending -= 1
+
+    def submit(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                raise PoolBusy(f"{self.name} pool is full")
+            self._pending += 1
+        try:
+            if self.processes:
+                future = self._get_executor().submit(fn, *args)
+            else:
+                # Threads run in the caller's context, e.g. its request ID
+                future = self._get_executor().submit(contextvars.copy_context().run, fn, *args)
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def call(self, fn, *args):
+        """Run fn in the pool and wait for it; for use off the event loop"""
+        return self.submit(fn, *args).result(timeout=self.timeout)
+
+    async def run(self, fn, *args, key=None):
+        """Run fn in the pool without blocking the event loop"""
+        shared = self._inflight.get(key) if key is not None else None
+        if shared is None:
+            shared = asyncio.wrap_future(self.submit(fn, *args))
+            if key is not None:
+                self._inflight[key] = shared
+                shared.add_done_callback(lambda f: self._finished(key, f))
+        # shield: one caller timing out must not cancel the shared run
+        return await asyncio.wait_for(asyncio.shield(shared), self.timeout)
+
+    def _finished(self, key, future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if not future.cancelled():
+            future.exception()  # mark retrieved even if every waiter timed out
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)